@@ -0,0 +1,107 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views import View
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from api.cache import aget_bundle_entry, aget_catalog_entry, catalog_response
+from api.filters import filter_geometry_features, simplify_geometry_features
+from api.models import CurrentGeometryFeature
+from api.serializers import CurrentGeometryFeatureSerializer
+from api.views import BOOTSTRAP_CATALOGS, ContributionViewSet
+
+# Async versions of the busiest read endpoints, routed in place of the DRF views when serving
+# over ASGI (see api/urls.py). Only GET is handled here; every other method is passed on to the
+# original view.
+
+
+def json_response(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), content_type="application/json", status=status
+    )
+
+
+def catalog_builder(viewset):
+    async def build():
+        items = [item async for item in viewset.queryset.all()]
+
+        return viewset.serializer_class(items, many=True).data
+
+    return build
+
+
+class AsyncReadView(View):
+    # The sync view that answers everything but GET and HEAD.
+    fallback = None
+
+    # Like the DRF views it stands in for, which check CSRF themselves when authenticating
+    # with a session.
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ["GET", "HEAD"]:
+            return await sync_to_async(self.fallback)(request, *args, **kwargs)
+
+        try:
+            return await self.get(request, *args, **kwargs)
+        except APIException as e:
+            return json_response(e.detail, status=e.status_code)
+
+
+class AsyncCatalogListView(AsyncReadView):
+    # The catalog viewset this lists, sharing its cache entries.
+    viewset = None
+
+    async def get(self, request):
+        entry = await aget_catalog_entry(
+            self.viewset.catalog, "list", catalog_builder(self.viewset)
+        )
+
+        return catalog_response(request, entry)
+
+
+class AsyncBootstrapView(AsyncReadView):
+    async def get(self, request):
+        entry = await aget_bundle_entry(
+            "bootstrap",
+            {
+                viewset.catalog: catalog_builder(viewset)
+                for viewset in BOOTSTRAP_CATALOGS
+            },
+        )
+
+        return catalog_response(request, entry)
+
+
+class AsyncGeometryFeatureListView(AsyncReadView):
+    async def get(self, request):
+        queryset = filter_geometry_features(
+            CurrentGeometryFeature.objects.all(), request.GET
+        )
+        queryset = simplify_geometry_features(queryset, request.GET)
+        features = [feature async for feature in queryset]
+
+        return json_response(CurrentGeometryFeatureSerializer(features, many=True).data)
+
+
+class AsyncContributionListView(AsyncReadView):
+    async def get(self, request):
+        # The viewset still builds the queryset and serializer, so both paths list the same rows.
+        view = ContributionViewSet(
+            action="list", request=Request(request), args=(), kwargs={}
+        )
+        view.format_kwarg = None
+        paginator = view.paginator
+
+        # DRF pagination has no async API, so the page is fetched the way the async ORM
+        # fetches rows itself, through sync_to_async.
+        page = await sync_to_async(paginator.paginate_queryset)(
+            view.get_queryset(), view.request, view
+        )
+        # Everything the serializer reads was loaded with the page.
+        serializer = view.get_serializer(page, many=True)
+
+        return json_response(paginator.get_paginated_response(serializer.data).data)
@@ -0,0 +1,245 @@
+import gzip
+import hashlib
+import time
+from functools import wraps
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# The shared tier is read on every lookup that misses the local one, and it alone holds the
+# namespace versions, so an invalidation is seen by every worker.
+def get_shared_cache():
+    return caches["default"]
+
+
+def get_local_cache():
+    return caches["local"]
+
+
+# Every namespace has a version that is bumped whenever its data changes. Entries are keyed by
+# version, so bumping it is all it takes to invalidate them. Versions are nanosecond times.
+def get_version(namespace):
+    shared_cache = get_shared_cache()
+    key = f"version:{namespace}"
+    version = shared_cache.get(key)
+
+    if version is None:
+        shared_cache.add(key, time.time_ns(), timeout=None)
+        version = shared_cache.get(key)
+
+    return version
+
+
+def invalidate(*namespaces):
+    def bump():
+        shared_cache = get_shared_cache()
+
+        for namespace in namespaces:
+            key = f"version:{namespace}"
+            version = max(time.time_ns(), (shared_cache.get(key) or 0) + 1)
+            shared_cache.set(key, version, timeout=None)
+
+    # Otherwise a request running alongside the write could cache the old rows under the new version.
+    transaction.on_commit(bump)
+
+
+# The key is hashed so it fits the database backend's key column whatever its length.
+def get_or_build(key, build, timeout=CACHE_TIMEOUT):
+    local_cache = get_local_cache()
+    cache_key = hashlib.sha256(key.encode()).hexdigest()
+    value = local_cache.get(cache_key)
+
+    if value is None:
+        shared_cache = get_shared_cache()
+        value = shared_cache.get(cache_key)
+
+        if value is None:
+            value = build()
+            shared_cache.set(cache_key, value, timeout)
+
+        local_cache.set(cache_key, value)
+
+    return value
+
+
+# The async counterparts take a coroutine function to build the value.
+async def aget_version(namespace):
+    shared_cache = get_shared_cache()
+    key = f"version:{namespace}"
+    version = await shared_cache.aget(key)
+
+    if version is None:
+        await shared_cache.aadd(key, time.time_ns(), timeout=None)
+        version = await shared_cache.aget(key)
+
+    return version
+
+
+async def aget_or_build(key, build, timeout=CACHE_TIMEOUT):
+    local_cache = get_local_cache()
+    cache_key = hashlib.sha256(key.encode()).hexdigest()
+    value = await local_cache.aget(cache_key)
+
+    if value is None:
+        shared_cache = get_shared_cache()
+        value = await shared_cache.aget(cache_key)
+
+        if value is None:
+            value = await build()
+            await shared_cache.aset(cache_key, value, timeout)
+
+        await local_cache.aset(cache_key, value)
+
+    return value
+
+
+def get_namespaced(namespace, key, build, timeout=CACHE_TIMEOUT):
+    return get_or_build(f"{namespace}:{get_version(namespace)}:{key}", build, timeout)
+
+
+# Caches what the function returns under the namespace, with a key built from its arguments.
+def cached(namespace, key, timeout=CACHE_TIMEOUT):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return get_namespaced(
+                namespace,
+                key(*args, **kwargs),
+                lambda: function(*args, **kwargs),
+                timeout,
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def build_catalog_entry(data, version):
+    body = JSONRenderer().render(data)
+
+    return {
+        "body": body,
+        "etag": quote_etag(hashlib.sha256(body).hexdigest()),
+        # Versions are nanoseconds, Last-Modified is seconds.
+        "last_modified": version // 10**9,
+    }
+
+
+def get_catalog_entry(catalog, key, build):
+    version = get_version(catalog)
+
+    return get_or_build(
+        f"{catalog}:{version}:{key}", lambda: build_catalog_entry(build(), version)
+    )
+
+
+async def aget_catalog_entry(catalog, key, build):
+    version = await aget_version(catalog)
+
+    async def build_entry():
+        return build_catalog_entry(await build(), version)
+
+    return await aget_or_build(f"{catalog}:{version}:{key}", build_entry)
+
+
+# Combines several catalogs into one document, cached until any of them changes. The
+# version is a hash of the content, so clients can tell whether their copy is current.
+def get_bundle_entry(name, builders):
+    versions = [get_version(catalog) for catalog in builders]
+
+    def build_bundle():
+        data = {catalog: builder() for catalog, builder in builders.items()}
+
+        return build_bundle_entry(data, versions)
+
+    return get_or_build(
+        f"{name}:" + ":".join(str(version) for version in versions), build_bundle
+    )
+
+
+async def aget_bundle_entry(name, builders):
+    versions = [await aget_version(catalog) for catalog in builders]
+
+    async def build_bundle():
+        data = {catalog: await builder() for catalog, builder in builders.items()}
+
+        return build_bundle_entry(data, versions)
+
+    return await aget_or_build(
+        f"{name}:" + ":".join(str(version) for version in versions), build_bundle
+    )
+
+
+def build_bundle_entry(data, versions):
+    version = hashlib.sha256(JSONRenderer().render(data)).hexdigest()
+    body = JSONRenderer().render({"version": version, **data})
+
+    return {
+        "body": body,
+        # mtime is fixed so the same body always compresses to the same bytes.
+        "gzip": gzip.compress(body, mtime=0),
+        # Weak, since the gzip and identity encodings share it.
+        "etag": f'W/"{version}"',
+        "last_modified": max(versions) // 10**9,
+    }
+
+
+def accepts_gzip(request):
+    return "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+
+
+def catalog_response(request, entry):
+    content_type = entry.get("content_type", "application/json")
+    response = get_conditional_response(
+        request, etag=entry["etag"], last_modified=entry["last_modified"]
+    )
+    if response is None and "gzip" in entry and accepts_gzip(request):
+        response = HttpResponse(entry["gzip"], content_type=content_type)
+        response["Content-Encoding"] = "gzip"
+    elif response is None:
+        response = HttpResponse(entry["body"], content_type=content_type)
+
+    if "gzip" in entry:
+        patch_vary_headers(response, ["Accept-Encoding"])
+
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    # Browsers may keep the body but must revalidate, which costs a 304 at most.
+    patch_cache_control(response, no_cache=True)
+
+    return response
+
+
+class CachedCatalogMixin:
+    # The namespace the catalog is cached and invalidated under. See api/signals.py.
+    catalog = None
+
+    def get_cached_response(self, request, key, build):
+        entry = get_catalog_entry(self.catalog, key, build)
+
+        return catalog_response(request, entry)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request,
+            "list",
+            lambda: self.get_serializer(self.get_queryset(), many=True).data,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request,
+            f"retrieve:{kwargs[self.lookup_url_kwarg or self.lookup_field]}",
+            lambda: self.get_serializer(self.get_object()).data,
+        )
@@ -0,0 +1,145 @@
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import (
+    content_disposition_header,
+    http_date,
+    parse_http_date_safe,
+)
+from api.streams import streaming_content
+
+
+CHUNK_SIZE = 64 * 1024
+# A single range. Anything else is answered with the whole file, which RFC 9110 allows.
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# Returns the first and last byte asked for, or None for the whole file. Raises ValueError
+# when the range starts past the end, which every range of an empty file does.
+def parse_range(header, size):
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    if size == 0:
+        raise ValueError("The file is empty.")
+
+    start, end = match.groups()
+    if not start:
+        # The last `end` bytes.
+        if int(end) == 0:
+            raise ValueError("Empty suffix range.")
+        return max(0, size - int(end)), size - 1
+
+    start = int(start)
+    if end and int(end) < start:
+        return None
+    if start >= size:
+        raise ValueError("Range starts past the end.")
+
+    return start, min(int(end), size - 1) if end else size - 1
+
+
+# A range is only sent if the client's copy is still current, otherwise the whole file is.
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def iter_file(name, start, end):
+    # S3 is asked for the range alone rather than the whole object.
+    if hasattr(default_storage, "iter_range"):
+        yield from default_storage.iter_range(name, start, end, CHUNK_SIZE)
+        return
+
+    with default_storage.open(name) as file:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def offload_response(name, content_type):
+    response = HttpResponse(content_type=content_type)
+
+    # The web server reads the file and answers ranges itself.
+    if settings.FILE_DOWNLOAD_OFFLOAD == "nginx":
+        response["X-Accel-Redirect"] = settings.FILE_DOWNLOAD_ACCEL_PREFIX + quote(name)
+    else:
+        response["X-Sendfile"] = default_storage.path(name)
+
+    return response
+
+
+def stream_response(request, name, size, etag, last_modified, content_type):
+    start, end = 0, size - 1
+    status = 200
+
+    if "HTTP_RANGE" in request.META and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META["HTTP_RANGE"], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+        if byte_range is not None:
+            start, end = byte_range
+            status = 206
+
+    if request.method == "HEAD":
+        response = HttpResponse(status=status, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(
+            streaming_content(iter_file(name, start, end)),
+            status=status,
+            content_type=content_type,
+        )
+
+    response["Content-Length"] = end - start + 1
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    return response
+
+
+# Serves a contribution's PDF. Blob content is named by its hash, which makes it the ETag;
+# older files never change either, so their row identifies them.
+def download_response(request, file, public):
+    name = file.file.name
+    etag = f'"{file.blob.sha256}"' if file.blob_id else f'"file-{file.id}"'
+    last_modified = int(file.date_uploaded.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        offload = settings.FILE_DOWNLOAD_OFFLOAD
+        if offload and isinstance(default_storage, FileSystemStorage):
+            response = offload_response(name, file.file_type)
+        else:
+            size = file.blob.size if file.blob_id else default_storage.size(name)
+            response = stream_response(
+                request, name, size, etag, last_modified, file.file_type
+            )
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = content_disposition_header(False, file.file_name)
+    # Files of contributions that aren't public mustn't be kept by shared caches.
+    if public:
+        patch_cache_control(response, public=True, max_age=60 * 60 * 24)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+
+    return response
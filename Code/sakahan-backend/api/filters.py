@@ -0,0 +1,93 @@
+from django.contrib.gis.geos import Polygon
+from rest_framework.exceptions import ValidationError
+from api.geometry import SIMPLIFIED_FIELDS, MAX_TILE_ZOOM, simplified_geometry
+
+
+def parse_boolean(value, name):
+    if value.lower() in ["true", "1"]:
+        return True
+    if value.lower() in ["false", "0"]:
+        return False
+
+    raise ValidationError({name: "Must be either 'true' or 'false'."})
+
+
+def parse_number(value, name, cast, minimum, maximum):
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValidationError({name: "Must be a number."})
+
+    if not minimum <= number <= maximum:
+        raise ValidationError({name: f"Must be between {minimum} and {maximum}."})
+
+    return number
+
+
+def parse_integer_list(value, name):
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise ValidationError({name: "Must be a comma-separated list of integers."})
+
+
+def parse_bbox(value, name):
+    try:
+        min_x, min_y, max_x, max_y = [float(item) for item in value.split(",")]
+    except ValueError:
+        raise ValidationError(
+            {name: "Must be in the format min_lon,min_lat,max_lon,max_lat."}
+        )
+
+    if min_x > max_x or min_y > max_y:
+        raise ValidationError(
+            {name: "Minimum coordinates must not exceed the maximum."}
+        )
+
+    bbox = Polygon.from_bbox((min_x, min_y, max_x, max_y))
+    bbox.srid = 4326
+
+    return bbox
+
+
+# Mirrors the CQL_FILTER the client sends to GeoServer: layer='<code>' AND published AND gridcode IN (...).
+def filter_geometry_features(queryset, query_params):
+    layer = query_params.get("layer")
+    published = query_params.get("published")
+    gridcodes = query_params.get("gridcode__in")
+    bbox = query_params.get("bbox")
+
+    if layer:
+        queryset = queryset.filter(layer=layer)
+
+    if published:
+        queryset = queryset.filter(published=parse_boolean(published, "published"))
+
+    if gridcodes is not None:
+        queryset = queryset.filter(
+            gridcode__in=parse_integer_list(gridcodes, "gridcode__in")
+        )
+
+    if bbox:
+        queryset = queryset.filter(geom__intersects=parse_bbox(bbox, "bbox"))
+
+    return queryset
+
+
+# Swaps geom for a simplified copy when the client asks for a zoom level or tolerance.
+def simplify_geometry_features(queryset, query_params):
+    zoom = query_params.get("zoom")
+    tolerance = query_params.get("tolerance")
+
+    if tolerance:
+        expression = simplified_geometry(
+            tolerance=parse_number(tolerance, "tolerance", float, 0, 1)
+        )
+    elif zoom:
+        expression = simplified_geometry(
+            zoom=parse_number(zoom, "zoom", int, 0, MAX_TILE_ZOOM)
+        )
+    else:
+        return queryset.defer(*SIMPLIFIED_FIELDS)
+
+    return queryset.defer("geom", *SIMPLIFIED_FIELDS).annotate(display_geom=expression)
@@ -0,0 +1,242 @@
+import json
+import math
+from django.conf import settings
+from django.contrib.gis.db.models import GeometryField, PolygonField
+from django.contrib.gis.db.models.functions import AsGeoJSON, Transform
+from django.contrib.gis.geos import GEOSException, Polygon
+from django.db import connection
+from django.db.models import BinaryField, F, Func, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+
+
+# Web Mercator tiles use a 4096 grid with a small buffer so polygon edges don't seam between tiles.
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+MAX_TILE_ZOOM = 24
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Each band serves zoom levels up to its limit from a precomputed column; higher zooms use geom.
+SIMPLIFICATION_BANDS = [(10, "geom_low"), (14, "geom_medium")]
+SIMPLIFIED_FIELDS = [field for _, field in SIMPLIFICATION_BANDS]
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def tile_bounds(z, x, y):
+    n = 2**z
+
+    west = x / n * 360 - 180
+    east = (x + 1) / n * 360 - 180
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+
+    return west, south, east, north
+
+
+def build_tile(queryset, z, x, y, name):
+    bounds = Polygon.from_bbox(tile_bounds(z, x, y))
+    bounds.srid = 4326
+
+    envelope = Func(
+        Value(z),
+        Value(x),
+        Value(y),
+        function="ST_TileEnvelope",
+        output_field=GeometryField(srid=3857),
+    )
+
+    # The bounding box filter uses the spatial index on geom before anything is clipped.
+    features = (
+        queryset.filter(geom__bboverlaps=bounds)
+        .annotate(
+            mvt_geom=Func(
+                Transform("geom", 3857),
+                envelope,
+                Value(TILE_EXTENT),
+                Value(TILE_BUFFER),
+                function="ST_AsMVTGeom",
+                # Not a GeometryField, which would cast the column to bytea and hide it from ST_AsMVT.
+                output_field=BinaryField(),
+            )
+        )
+        .values("id", "gridcode", "layer", "reference", "published", "mvt_geom")
+    )
+    sql, params = features.query.sql_with_params()
+
+    # values() selects the foreign key as reference_id, so the attributes are named here.
+    attributes = "id, gridcode, layer, reference_id AS reference, published, mvt_geom"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT ST_AsMVT(tile, %s, {TILE_EXTENT}, 'mvt_geom', 'id') "
+            f"FROM (SELECT {attributes} FROM ({sql}) AS features) AS tile",
+            [name, *params],
+        )
+        row = cursor.fetchone()
+
+    return bytes(row[0]) if row and row[0] else b""
+
+
+def clean_ring(ring):
+    precision = settings.GEOMETRY_COORDINATE_PRECISION
+
+    try:
+        coordinates = [
+            (round(float(x), precision), round(float(y), precision)) for x, y in ring
+        ]
+    except (TypeError, ValueError):
+        raise ValueError("Coordinates must be [longitude, latitude] pairs.")
+
+    # Snapping can collapse neighbouring vertices into duplicates.
+    coordinates = [
+        coordinate
+        for index, coordinate in enumerate(coordinates)
+        if index == 0 or coordinate != coordinates[index - 1]
+    ]
+
+    if coordinates and coordinates[0] != coordinates[-1]:
+        coordinates.append(coordinates[0])
+
+    if len(coordinates) < 4:
+        raise ValueError("A polygon needs at least three distinct vertices.")
+
+    if len(coordinates) > settings.GEOMETRY_MAX_VERTICES:
+        raise ValueError(
+            f"A polygon can have at most {settings.GEOMETRY_MAX_VERTICES} vertices."
+        )
+
+    for x, y in coordinates:
+        if not (-180 <= x <= 180 and -90 <= y <= 90):
+            raise ValueError("Coordinates must be valid longitudes and latitudes.")
+
+    return coordinates
+
+
+# A self-intersecting ring is split into the valid polygons it encloses.
+def repair_polygon(polygon):
+    if polygon.valid:
+        return [polygon]
+
+    repaired = polygon.make_valid()
+    if repaired.geom_type == "Polygon":
+        parts = [repaired]
+    elif repaired.geom_type == "MultiPolygon":
+        parts = list(repaired)
+    elif repaired.geom_type == "GeometryCollection":
+        parts = [
+            part
+            for geometry in repaired
+            for part in (
+                geometry if geometry.geom_type == "MultiPolygon" else [geometry]
+            )
+            if part.geom_type == "Polygon"
+        ]
+    else:
+        # A ring that folds back onto itself collapses into a line or a point.
+        parts = []
+
+    polygons = []
+    for part in parts:
+        if not part.empty and part.area > 0:
+            part.srid = polygon.srid
+            polygons.append(part)
+
+    return polygons
+
+
+# Each item of geom is the exterior ring of one polygon, as sent by the drawing tools.
+def build_polygons(geom):
+    if not isinstance(geom, list):
+        raise ValidationError({"geom": "Must be a list of polygon rings."})
+
+    polygons = []
+    errors = {}
+
+    for index, ring in enumerate(geom):
+        try:
+            repaired = repair_polygon(Polygon(clean_ring(ring), srid=4326))
+        except ValueError as e:
+            errors[index] = str(e)
+            continue
+        except GEOSException:
+            errors[index] = "Not a valid polygon ring."
+            continue
+
+        if not repaired:
+            errors[index] = "The polygon has no area."
+            continue
+
+        polygons.extend(repaired)
+
+    if errors:
+        raise ValidationError({"geom": errors})
+
+    return polygons
+
+
+# The size of one pixel of a 256px tile at the given zoom, in degrees.
+def zoom_tolerance(zoom):
+    return 360 / (256 * 2**zoom)
+
+
+def simplify_polygon(polygon, tolerance):
+    simplified = polygon.simplify(tolerance, preserve_topology=True)
+
+    if simplified.empty or simplified.geom_type != "Polygon":
+        return polygon
+
+    return simplified
+
+
+def simplified_geometry(zoom=None, tolerance=None):
+    if tolerance is not None:
+        return Func(
+            "geom",
+            Value(tolerance),
+            function="ST_SimplifyPreserveTopology",
+            output_field=PolygonField(),
+        )
+
+    for max_zoom, field in SIMPLIFICATION_BANDS:
+        if zoom <= max_zoom:
+            # Rows saved before the band was populated fall back to the full geometry.
+            return Coalesce(field, "geom", output_field=PolygonField())
+
+    return F("geom")
+
+
+# Writes the same FeatureCollection as CurrentGeometryFeatureSerializer, one chunk at a time,
+# with each geometry already encoded as GeoJSON by PostGIS.
+def stream_feature_collection(queryset):
+    geom = "display_geom" if "display_geom" in queryset.query.annotations else "geom"
+    features = queryset.annotate(geojson=AsGeoJSON(geom)).values_list(
+        "id", "published", "gridcode", "layer", "reference", "geojson"
+    )
+
+    yield '{"type":"FeatureCollection","features":['
+
+    chunk = []
+    for index, (id, published, gridcode, layer, reference, geojson) in enumerate(
+        features.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ):
+        properties = json.dumps(
+            {
+                "published": published,
+                "gridcode": gridcode,
+                "layer": layer,
+                "reference": reference,
+            }
+        )
+        separator = "," if index else ""
+        chunk.append(
+            f'{separator}{{"id":{id},"type":"Feature","geometry":{geojson},"properties":{properties}}}'
+        )
+
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+
+    yield "".join(chunk) + "]}"
@@ -0,0 +1,100 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Attributes every LogRecord has. Anything else was passed through extra= and is logged as a field.
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+
+# Lets through one in every 1/rate debug records. A record can set its own rate with
+# extra={"sample_rate": ...}. Higher levels always pass.
+class SampledFilter(logging.Filter):
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+
+        return random.random() < getattr(record, "sample_rate", self.rate)
+
+
+# Puts records on a queue that a background thread writes to stdout, so a request never waits
+# on the log stream. When the queue is full records are dropped instead of blocking.
+class QueueingHandler(QueueHandler):
+    def __init__(self, maxsize=10000):
+        super().__init__(None)
+        self.maxsize = maxsize
+        self.pid = None
+        self.listener = None
+        self.start_lock = threading.Lock()
+
+    # The listener thread does not survive a fork, so every worker starts its own.
+    def start(self):
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+
+            self.queue = queue.Queue(self.maxsize)
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(self.formatter or JSONFormatter())
+
+            self.listener = QueueListener(self.queue, stream)
+            self.listener.start()
+            self.pid = os.getpid()
+            atexit.register(self.listener.stop)
+
+    def prepare(self, record):
+        # Formatting happens on the listener thread; only the message and traceback are
+        # resolved here, while the arguments they refer to are still current.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def emit(self, record):
+        if self.pid != os.getpid():
+            self.start()
+
+        super().emit(record)
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from drf_spectacular.drainage import GENERATOR_STATS
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+
+def generate_schema():
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    with GENERATOR_STATS.silence():
+        schema = generator.get_schema(request=None, public=True)
+
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+class Command(BaseCommand):
+    help = "Writes the OpenAPI schema that is served at /api/schema/"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Fail if the schema file is out of date instead of writing it",
+        )
+
+    def handle(self, *args, **options):
+        schema = generate_schema()
+        path = settings.SCHEMA_FILE
+
+        if options["check"]:
+            if not path.exists() or path.read_bytes() != schema:
+                raise CommandError(
+                    f"{path.name} is out of date, run `python manage.py build_schema`."
+                )
+            return
+
+        path.write_bytes(schema)
+        self.stdout.write(f"Wrote {path}")
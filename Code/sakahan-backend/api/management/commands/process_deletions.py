@@ -0,0 +1,173 @@
+import logging
+import time
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from api.models import Blob, File, StorageDeletion
+
+
+logger = logging.getLogger(__name__)
+
+# A failed deletion waits 1, 2, 4... minutes before it is tried again, up to a day.
+MAX_RETRY_DELAY = timedelta(days=1)
+# What the sweep leaves alone, such as uploads that haven't been confirmed yet.
+SWEEP_GRACE = timedelta(days=1)
+# Where files are stored, see upload_path and blob_path.
+SWEEP_PREFIXES = ["contributions/", "blobs/"]
+SWEEP_BATCH_SIZE = 1000
+
+
+def delete_stored_files(names):
+    if hasattr(default_storage, "delete_many"):
+        return default_storage.delete_many(names)
+
+    errors = {}
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except Exception as e:
+            errors[name] = str(e)
+
+    return errors
+
+
+def list_stored_files(prefix):
+    if hasattr(default_storage, "list_files"):
+        yield from default_storage.list_files(prefix)
+        return
+
+    if not default_storage.exists(prefix):
+        return
+
+    directories, files = default_storage.listdir(prefix)
+    for name in files:
+        yield f"{prefix}{name}", default_storage.get_modified_time(f"{prefix}{name}")
+    for directory in directories:
+        yield from list_stored_files(f"{prefix}{directory}/")
+
+
+def get_referenced_names(names):
+    return set(
+        Blob.objects.filter(file__in=names).values_list("file", flat=True)
+    ) | set(File.objects.filter(file__in=names).values_list("file", flat=True))
+
+
+def process_batch(size):
+    with transaction.atomic():
+        # Skipping locked rows lets several workers share the queue.
+        deletions = list(
+            StorageDeletion.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt__lte=timezone.now())
+            .order_by("next_attempt")[:size]
+        )
+        if not deletions:
+            return 0
+
+        # A name is stored again when the same content is uploaded after it was queued.
+        names = [deletion.name for deletion in deletions]
+        referenced = get_referenced_names(names)
+        errors = delete_stored_files([name for name in names if name not in referenced])
+
+        failed = [deletion for deletion in deletions if deletion.name in errors]
+        for deletion in failed:
+            delay = timedelta(minutes=2 ** min(deletion.attempts, 12))
+            deletion.attempts += 1
+            deletion.last_error = errors[deletion.name]
+            deletion.next_attempt = timezone.now() + min(delay, MAX_RETRY_DELAY)
+            logger.warning(
+                "Storage deletion failed",
+                extra={"file": deletion.name, "attempts": deletion.attempts},
+            )
+
+        StorageDeletion.objects.bulk_update(
+            failed, ["attempts", "last_error", "next_attempt"]
+        )
+        StorageDeletion.objects.filter(
+            id__in=[deletion.id for deletion in deletions if deletion not in failed]
+        ).delete()
+
+    return len(deletions)
+
+
+# Finds what the queue never heard of: blobs and files left behind by cascaded deletes, which
+# skip File.delete, and uploads that were never confirmed.
+def sweep():
+    cutoff = timezone.now() - SWEEP_GRACE
+
+    blobs = Blob.objects.filter(files__isnull=True, date_created__lt=cutoff)
+    Blob.release(list(blobs.values_list("id", flat=True)))
+
+    queued = 0
+    for prefix in SWEEP_PREFIXES:
+        names = []
+        for name, modified in list_stored_files(prefix):
+            if modified < cutoff:
+                names.append(name)
+            if len(names) == SWEEP_BATCH_SIZE:
+                queued += queue_unreferenced(names)
+                names = []
+        queued += queue_unreferenced(names)
+
+    return queued
+
+
+def queue_unreferenced(names):
+    referenced = get_referenced_names(names)
+    orphans = [name for name in names if name not in referenced]
+    StorageDeletion.enqueue(orphans)
+
+    return len(orphans)
+
+
+class Command(BaseCommand):
+    help = "Deletes the stored files queued for deletion"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="How many files to delete at once",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, waiting for more deletions",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=30,
+            help="Seconds to wait when nothing is due, with --loop",
+        )
+        parser.add_argument(
+            "--sweep",
+            action="store_true",
+            help="First queue stored files that nothing refers to anymore",
+        )
+
+    def handle(self, *args, **options):
+        if options["sweep"]:
+            self.stdout.write(f"Queued {sweep()} orphaned files")
+
+        processed = 0
+        while True:
+            try:
+                count = process_batch(options["batch_size"])
+            except Exception:
+                # The storage may be unreachable for a while, the batch is left as it was.
+                if not options["loop"]:
+                    raise
+                logger.exception("Storage deletion batch failed")
+                count = 0
+
+            processed += count
+            if count:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(f"Processed {processed} deletions")
@@ -0,0 +1,72 @@
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# "import time: <self us> | <cumulative us> | <indent><module>", as printed by -X importtime.
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \| *(\S+)$")
+
+
+class Command(BaseCommand):
+    help = "Shows where the time goes when a worker imports the app"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="How many packages and modules to list",
+        )
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        module, application = settings.WSGI_APPLICATION.rsplit(".", 1)
+
+        # A fresh interpreter, so nothing is imported already. It does what a worker does
+        # before its first request: load the app and its urlconf.
+        startup = (
+            f"from {module} import {application}\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", startup],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            # The traceback comes last, after the import times that were recorded.
+            errors = [
+                line
+                for line in result.stderr.splitlines()
+                if line.strip() and not IMPORT_TIME.match(line)
+            ]
+            error = errors[-1] if errors else "no error output"
+            raise CommandError(
+                f"The app failed to load (exit code {result.returncode}): {error}"
+            )
+
+        # Self times, so nothing is counted twice.
+        packages = defaultdict(int)
+        modules = []
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME.match(line)
+            if not match:
+                continue
+
+            self_time, name = match.groups()
+            packages[name.split(".")[0]] += int(self_time)
+            modules.append((int(self_time), name))
+
+        total = sum(packages.values())
+        self.stdout.write(f"Total import time: {total / 1000:.1f} ms\n")
+
+        self.stdout.write("Packages, by time spent in their own modules:")
+        for name, time in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f"{time / 1000:10.1f} ms  {name}")
+
+        self.stdout.write("\nModules, by time spent in the module itself:")
+        for time, name in sorted(modules, reverse=True)[:limit]:
+            self.stdout.write(f"{time / 1000:10.1f} ms  {name}")
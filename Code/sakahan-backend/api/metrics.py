@@ -0,0 +1,165 @@
+import heapq
+import os
+import threading
+import time
+from asgiref.sync import sync_to_async
+from api.cache import get_shared_cache
+
+
+SLOW_QUERY_LIMIT = 10
+SLOW_QUERY_LENGTH = 300
+
+# Each worker aggregates in memory and copies its totals to the shared cache at most this
+# often, so /api/_metrics can add up every worker whichever one serves it.
+FLUSH_INTERVAL = 10
+# Workers that have not flushed for this long are assumed gone.
+WORKER_TIMEOUT = 60 * 60 * 24
+
+WORKERS_KEY = "metrics:workers"
+
+# The totals kept per (method, route, status), in this order.
+TOTALS = [
+    ("requests_total", "counter", "Requests handled."),
+    ("request_duration_seconds_total", "counter", "Time spent handling requests."),
+    ("db_queries_total", "counter", "Database queries run while handling requests."),
+    ("db_duration_seconds_total", "counter", "Time spent in database queries."),
+    ("response_size_bytes_total", "counter", "Bytes of response bodies sent."),
+]
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+
+            if len(self.slowest) < SLOW_QUERY_LIMIT:
+                heapq.heappush(self.slowest, (duration, sql))
+            else:
+                heapq.heappushpop(self.slowest, (duration, sql))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.slowest = []
+        self.flushed = 0
+
+    def record(self, method, route, status, duration, queries, size):
+        if self.add(method, route, status, duration, queries, size):
+            self.flush()
+
+    # The shared cache may be the database or files, so from the event loop it is flushed
+    # to on a thread.
+    async def arecord(self, method, route, status, duration, queries, size):
+        if self.add(method, route, status, duration, queries, size):
+            await sync_to_async(self.flush)()
+
+    # Returns whether the totals are due to be flushed.
+    def add(self, method, route, status, duration, queries, size):
+        key = (method, route, str(status))
+
+        with self.lock:
+            totals = self.totals.setdefault(key, [0] * len(TOTALS))
+            for index, value in enumerate(
+                [1, duration, queries.count, queries.duration, size]
+            ):
+                totals[index] += value
+
+            for query_duration, sql in queries.slowest:
+                self.slowest.append((query_duration, route, sql[:SLOW_QUERY_LENGTH]))
+            self.slowest = heapq.nlargest(SLOW_QUERY_LIMIT, self.slowest)
+
+            due = time.monotonic() - self.flushed > FLUSH_INTERVAL
+            if due:
+                # Claimed here, so concurrent requests don't flush as well.
+                self.flushed = time.monotonic()
+
+        return due
+
+    def flush(self):
+        shared_cache = get_shared_cache()
+        pid = os.getpid()
+        now = time.time()
+
+        with self.lock:
+            snapshot = {
+                "totals": {key: list(totals) for key, totals in self.totals.items()},
+                "slowest": list(self.slowest),
+            }
+            self.flushed = time.monotonic()
+
+        shared_cache.set(f"metrics:worker:{pid}", snapshot, WORKER_TIMEOUT)
+
+        # A registration lost to a concurrent flush is restored by the next one.
+        workers = {
+            worker: seen
+            for worker, seen in (shared_cache.get(WORKERS_KEY) or {}).items()
+            if now - seen < WORKER_TIMEOUT
+        }
+        workers[pid] = now
+        shared_cache.set(WORKERS_KEY, workers, None)
+
+    def collect(self):
+        self.flush()
+
+        shared_cache = get_shared_cache()
+        workers = shared_cache.get(WORKERS_KEY) or {}
+        snapshots = shared_cache.get_many(
+            [f"metrics:worker:{worker}" for worker in workers]
+        ).values()
+
+        totals = {}
+        slowest = []
+        for snapshot in snapshots:
+            for key, values in snapshot["totals"].items():
+                merged = totals.setdefault(key, [0] * len(TOTALS))
+                for index, value in enumerate(values):
+                    merged[index] += value
+            slowest.extend(snapshot["slowest"])
+
+        return totals, heapq.nlargest(SLOW_QUERY_LIMIT, slowest)
+
+
+registry = MetricsRegistry()
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Prometheus text exposition format, version 0.0.4.
+def render_metrics(totals, slowest):
+    lines = []
+
+    for index, (name, kind, description) in enumerate(TOTALS):
+        lines.append(f"# HELP sakahan_{name} {description}")
+        lines.append(f"# TYPE sakahan_{name} {kind}")
+
+        for (method, route, status), values in sorted(totals.items()):
+            labels = (
+                f'method="{escape_label(method)}",'
+                f'route="{escape_label(route)}",'
+                f'status="{status}"'
+            )
+            lines.append(f"sakahan_{name}{{{labels}}} {values[index]}")
+
+    lines.append(
+        "# HELP sakahan_slow_query_duration_seconds The slowest queries seen by any worker."
+    )
+    lines.append("# TYPE sakahan_slow_query_duration_seconds gauge")
+    for duration, route, sql in slowest:
+        labels = f'route="{escape_label(route)}",sql="{escape_label(sql)}"'
+        lines.append(f"sakahan_slow_query_duration_seconds{{{labels}}} {duration}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,89 @@
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+from api.metrics import QueryRecorder, registry
+
+
+def is_staff(user):
+    return bool(user and user.is_staff)
+
+
+async def aget_user(request):
+    user = getattr(request, "user", None)
+
+    # The session user is loaded lazily, which can't be done from async code. A DRF view
+    # replaces it with the user it authenticated.
+    if isinstance(user, SimpleLazyObject):
+        return await request.auser()
+
+    return user
+
+
+class RequestMetricsMiddleware:
+    # Async capable, so async views are not pushed onto a thread to run behind it.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries = QueryRecorder()
+        start = time.perf_counter()
+
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        show_timings = settings.DEBUG or is_staff(getattr(request, "user", None))
+        registry.record(*self.measure(request, response, duration, queries))
+
+        return self.add_timings(response, duration, show_timings, queries)
+
+    # Async queries run on a thread shared by concurrent requests, so they can't be told apart
+    # and are not counted.
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        duration = time.perf_counter() - start
+
+        show_timings = settings.DEBUG or is_staff(await aget_user(request))
+        await registry.arecord(*self.measure(request, response, duration))
+
+        return self.add_timings(response, duration, show_timings)
+
+    def measure(self, request, response, duration, queries=None):
+        # Streamed bodies are produced after this returns, so neither their size nor their queries are seen.
+        size = 0 if response.streaming else len(response.content)
+        route = request.resolver_match.route if request.resolver_match else "unmatched"
+
+        return (
+            request.method,
+            route,
+            response.status_code,
+            duration,
+            queries or QueryRecorder(),
+            size,
+        )
+
+    def add_timings(self, response, duration, show_timings, queries=None):
+        # Timings describe the server, so they are only shown to developers and staff.
+        if not show_timings:
+            return response
+
+        timings = [f"app;dur={duration * 1000:.1f}"]
+        if queries is not None:
+            timings.append(
+                f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"'
+            )
+        response["Server-Timing"] = ", ".join(timings)
+
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_currentcrop_isdeleted_currentcropelement_isdeleted'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='currentgeometryfeature',
+            index=models.Index(fields=['layer', 'published', 'gridcode'], name='current_geometry_filter'),
+        ),
+    ]
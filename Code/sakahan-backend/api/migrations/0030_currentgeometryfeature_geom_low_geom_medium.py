@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:28
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_currentgeometryfeature_current_geometry_filter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='currentgeometryfeature',
+            name='geom_low',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='currentgeometryfeature',
+            name='geom_medium',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        # Backfill with the tolerances of zoom 10 and 14 from api.geometry.zoom_tolerance.
+        migrations.RunSQL(
+            sql="""
+                UPDATE api_currentgeometryfeature
+                SET geom_low = ST_SimplifyPreserveTopology(geom, 0.001373291015625),
+                    geom_medium = ST_SimplifyPreserveTopology(geom, 0.0000858306884765625);
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:30
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_currentgeometryfeature_geom_low_geom_medium'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contribution',
+            name='bbox',
+            field=django.contrib.gis.db.models.fields.PolygonField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='contribution',
+            name='centroid',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE api_contribution AS contribution
+                SET centroid = extent.centroid,
+                    bbox = ST_MakeEnvelope(
+                        ST_XMin(extent.box), ST_YMin(extent.box),
+                        ST_XMax(extent.box), ST_YMax(extent.box), 4326
+                    )
+                FROM (
+                    SELECT reference_id,
+                           ST_Extent(geom) AS box,
+                           ST_Centroid(ST_Collect(geom)) AS centroid
+                    FROM api_currentgeometryfeature
+                    GROUP BY reference_id
+                ) AS extent
+                WHERE extent.reference_id = contribution.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
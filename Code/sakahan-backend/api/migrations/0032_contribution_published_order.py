@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_contribution_centroid_bbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contribution',
+            index=models.Index(fields=['-date_published', '-id'], name='contribution_published_order'),
+        ),
+    ]
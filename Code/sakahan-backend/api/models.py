@@ -1,6 +1,10 @@
-import os
+import hashlib
 from django.core.files.storage import default_storage
 from django.contrib.gis.db import models
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.db import connection, transaction
+from django.utils import timezone
+from api.geometry import SIMPLIFICATION_BANDS, simplify_polygon, zoom_tolerance
 from django.contrib.auth.models import (
     BaseUserManager,
     AbstractBaseUser,
@@ -174,10 +178,76 @@ class Contribution(models.Model):
     # Use this to put something like modified by user at mm/dd/yyyy hh:mm:ss
     last_modified = models.DateTimeField(auto_now=True)
 
+    # Summaries of the geometries so lists can locate a contribution without loading them.
+    centroid = models.PointField(null=True, blank=True, spatial_index=False)
+    bbox = models.PolygonField(null=True, blank=True, spatial_index=False)
+
+    class Meta:
+        indexes = [
+            # Backs the cursor pagination of the records panel.
+            models.Index(
+                fields=["-date_published", "-id"],
+                name="contribution_published_order",
+            )
+        ]
+
+    # The CQL_FILTER code of the map layer this contribution's geometries are drawn on.
+    def get_layer(self):
+        if self.crop_element:
+            return self.crop_element.get_code()
+
+        return self.crop.get_code()
+
+    def set_extent(self, polygons):
+        if not polygons:
+            self.centroid = None
+            self.bbox = None
+            return
+
+        collection = MultiPolygon(polygons, srid=4326)
+        self.centroid = collection.centroid
+        self.bbox = Polygon.from_bbox(collection.extent)
+        self.bbox.srid = 4326
+
     def __str__(self):
         return f"{self.author.first_name}_{self.crop.name}_{self.suitability_level}"
 
 
+class CurrentGeometryFeatureManager(models.Manager):
+    # Recomputes the layer of every geometry whose contribution uses the given crops or
+    # crop elements in a single statement. Mirrors Contribution.get_layer().
+    def refresh_layers(self, crops=(), crop_elements=()):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                UPDATE api_currentgeometryfeature AS feature
+                SET layer = CASE
+                    WHEN element.id IS NOT NULL THEN
+                        lower(replace(element.name, ' ', '_'))
+                        || '_' || lower(replace(category.name, ' ', '_'))
+                    ELSE lower(replace(crop.name, ' ', '_'))
+                END
+                FROM api_contribution AS contribution
+                LEFT JOIN api_currentcrop AS crop
+                    ON crop.id = contribution.crop_id
+                LEFT JOIN api_currentcropelement AS element
+                    ON element.id = contribution.crop_element_id
+                LEFT JOIN api_currentcrop AS category
+                    ON category.id = element.category_id
+                WHERE feature.reference_id = contribution.id
+                    AND (element.id IS NOT NULL OR crop.id IS NOT NULL)
+                    AND (
+                        contribution.crop_id = ANY(%s::bigint[])
+                        OR element.category_id = ANY(%s::bigint[])
+                        OR contribution.crop_element_id = ANY(%s::bigint[])
+                    )
+                """,
+                [list(crops), list(crops), list(crop_elements)],
+            )
+
+            return cursor.rowcount
+
+
 class CurrentGeometryFeature(models.Model):
     # This maps the color map set in geoserver.
     gridcode = models.IntegerField()
@@ -190,14 +260,32 @@ class CurrentGeometryFeature(models.Model):
     # This is set to False when the contribution is rejected.
     published = models.BooleanField(default=True)
 
+    objects = CurrentGeometryFeatureManager()
+
+    # PolygonField creates a GiST index on geom for the bbox and tile queries.
     geom = models.PolygonField()
+    # Simplified copies of geom served at low zoom levels. See SIMPLIFICATION_BANDS.
+    geom_low = models.PolygonField(null=True, blank=True, spatial_index=False)
+    geom_medium = models.PolygonField(null=True, blank=True, spatial_index=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["layer", "published", "gridcode"],
+                name="current_geometry_filter",
+            )
+        ]
+
+    def set_simplified_geometries(self):
+        for max_zoom, field in SIMPLIFICATION_BANDS:
+            simplified = simplify_polygon(self.geom, zoom_tolerance(max_zoom))
+            setattr(self, field, simplified)
 
-    def update_layer(self):
-        if self.reference:
-            if self.reference.crop_element:
-                return self.reference.crop_element.get_code()
-            else:
-                return self.reference.crop.get_code()
+    def save(self, *args, **kwargs):
+        if "geom" not in self.get_deferred_fields():
+            self.set_simplified_geometries()
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.layer}_{self.gridcode}"
@@ -217,6 +305,122 @@ def upload_path(instance, filename):
     return f"contributions/{instance.contribution.id}/pdfs/{filename}"
 
 
+def blob_path(instance, filename):
+    return f"blobs/{instance.sha256[:2]}/{instance.sha256}.pdf"
+
+
+# Hashed a chunk at a time, the way the content is read from the upload or the storage.
+def hash_file(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+
+    return digest.hexdigest()
+
+
+# The content of an uploaded PDF, stored once under its hash however many files share it.
+# Its references are the File rows pointing at it.
+class Blob(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=blob_path)
+    size = models.IntegerField()
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+    # Returns the blob holding this content, storing it if there is none. Call it in the
+    # transaction that adds the reference: the row stays locked until then, so the blob
+    # can't be released in between.
+    @classmethod
+    def store(cls, file):
+        return cls.get_or_write(
+            hash_file(file), file.size, lambda name: default_storage.save(name, file)
+        )
+
+    # The same for content already in storage under another name, whose hash the storage
+    # has verified. It is copied there rather than read by the app.
+    @classmethod
+    def store_copy(cls, source, sha256, size):
+        return cls.get_or_write(
+            sha256, size, lambda name: default_storage.copy(source, name)
+        )
+
+    @classmethod
+    def get_or_write(cls, sha256, size, write):
+        blob, created = cls.objects.get_or_create(
+            sha256=sha256, defaults={"size": size}
+        )
+        blob = cls.objects.select_for_update().get(pk=blob.pk)
+
+        if created:
+            # The name comes from the hash, so a failed attempt is simply overwritten. The
+            # content may also be queued for deletion from an earlier blob; this waits for
+            # a worker already deleting it.
+            name = blob_path(blob, None)
+            StorageDeletion.objects.filter(name=name).delete()
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            blob.file = write(name)
+            blob.save(update_fields=["file"])
+
+        return blob
+
+    # Removes the given blobs that no File points at anymore, queueing their content for
+    # deletion.
+    @classmethod
+    def release(cls, ids):
+        with transaction.atomic():
+            # Locked first, so a reference added meanwhile is seen by the query after.
+            blobs = list(cls.objects.select_for_update().filter(id__in=ids))
+            referenced = set(
+                File.objects.filter(blob__in=blobs).values_list("blob", flat=True)
+            )
+            released = [blob for blob in blobs if blob.id not in referenced]
+            if not released:
+                return
+
+            cls.objects.filter(id__in=[blob.id for blob in released]).delete()
+            StorageDeletion.enqueue([blob.file.name for blob in released])
+
+
+# Stored files waiting for `manage.py process_deletions`, so deleting one in a request is a
+# single write. Queued in the same transaction as the rows they belonged to.
+class StorageDeletion(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["next_attempt"], name="storage_deletion_due"),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def enqueue(cls, names):
+        cls.objects.bulk_create(
+            [cls(name=name) for name in names if name], ignore_conflicts=True
+        )
+
+
+# Deletes the files with a fixed number of queries, and queues whatever was stored for
+# them alone.
+def delete_files(files):
+    with transaction.atomic():
+        rows = list(files.values_list("blob", "file"))
+        files.delete()
+
+        # Files from before blobs have their own copy.
+        StorageDeletion.enqueue([file for blob, file in rows if blob is None])
+        Blob.release({blob for blob, file in rows if blob is not None})
+
+
 class File(models.Model):
     contribution = models.ForeignKey(
         Contribution, on_delete=models.CASCADE, related_name="pdfs"
@@ -224,6 +428,10 @@ class File(models.Model):
     date_uploaded = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(UserAccount, on_delete=models.CASCADE)
     file = models.FileField(upload_to=upload_path)
+    # Files uploaded before blobs existed have none, and their own copy in `file`.
+    blob = models.ForeignKey(
+        Blob, on_delete=models.PROTECT, related_name="files", null=True, blank=True
+    )
     file_identifier = models.CharField(max_length=255, unique=True)
     file_name = models.CharField(max_length=255)
     file_size = models.IntegerField()
@@ -232,14 +440,20 @@ class File(models.Model):
     def __str__(self):
         return f"{self.contribution.title}_PDF_{self.uploaded_by.email}"
 
+    # The name a PDF is stored under, known before it is uploaded.
+    @classmethod
+    def get_storage_name(cls, contribution, filename):
+        field = cls._meta.get_field("file")
+        return field.generate_filename(cls(contribution=contribution), filename)
+
     def delete(self, *args, **kwargs):
-        # Check if the file exists and delete from the file system (for local storage)
-        if self.file:
-            # Check if it's a local file or stored on a cloud service (S3, etc.)
-            if hasattr(self.file, "storage") and self.file.storage != default_storage:
-                # Delete the file from cloud storage (e.g., S3, DigitalOcean Spaces)
-                self.file.storage.delete(self.file.name)
-            elif os.path.isfile(self.file.path):
-                # Delete the local file
-                os.remove(self.file.path)
-        super().delete(*args, **kwargs)
+        # The blob may be shared, so it is released rather than deleted.
+        if self.blob_id is not None:
+            with transaction.atomic():
+                result = super().delete(*args, **kwargs)
+                Blob.release([self.blob_id])
+            return result
+
+        with transaction.atomic():
+            StorageDeletion.enqueue([self.file.name])
+            return super().delete(*args, **kwargs)
@@ -0,0 +1,72 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from api.filters import parse_boolean
+
+
+class ContributionPagination(CursorPagination):
+    # The id breaks ties between contributions published at the same instant.
+    ordering = ("-date_published", "-id")
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy = None
+        self.count = None
+
+        # Clients that still ask for ?page=N keep the page number pagination.
+        if PageNumberPagination.page_query_param in request.query_params:
+            self.legacy = PageNumberPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+
+        # Counting the whole table is the expensive part, so it is opt-in with ?count=true.
+        count = request.query_params.get(self.count_query_param)
+        if count and parse_boolean(count, self.count_query_param):
+            self.count = queryset.count()
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy:
+            return self.legacy.get_paginated_response(data)
+
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data["count"] = self.count
+
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"] = {
+            "type": "integer",
+            "example": 123,
+        }
+
+        return response_schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": PageNumberPagination.page_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Use page number pagination instead of cursors",
+                "schema": {"type": "integer"},
+            }
+        )
+        parameters.append(
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Include the total number of results: 'true' or 'false'",
+                "schema": {"type": "boolean"},
+            }
+        )
+
+        return parameters
+
+    def to_html(self):
+        if self.legacy:
+            return self.legacy.to_html()
+
+        return super().to_html()
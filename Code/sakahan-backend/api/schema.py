@@ -1,5 +1,12 @@
+import gzip
+import hashlib
+import json
+import yaml
+from functools import lru_cache
 from django.conf import settings
+from django.views import View
 from drf_spectacular.openapi import AutoSchema
+from api.cache import catalog_response
 
 
 class CustomAutoSchema(AutoSchema):
@@ -14,3 +21,32 @@ class CustomAutoSchema(AutoSchema):
         if len(tokenized_path) > 1:
             return [tokenized_path[1]]
         return tokenized_path[:1]
+
+
+# The schema only changes with a deploy, so each process reads the file once.
+@lru_cache
+def get_schema_entry(format):
+    path = settings.SCHEMA_FILE
+    body = path.read_bytes()
+    content_type = "application/vnd.oai.openapi"
+
+    if format == "json":
+        body = json.dumps(yaml.safe_load(body)).encode()
+        content_type = "application/vnd.oai.openapi+json"
+
+    return {
+        "body": body,
+        "gzip": gzip.compress(body, mtime=0),
+        # Weak, as in api/cache.py.
+        "etag": f'W/"{hashlib.sha256(body).hexdigest()}"',
+        "last_modified": int(path.stat().st_mtime),
+        "content_type": content_type,
+    }
+
+
+# Serves the schema written by `manage.py build_schema` instead of generating it per request.
+class SchemaView(View):
+    def get(self, request):
+        format = "json" if request.GET.get("format") == "json" else "yaml"
+
+        return catalog_response(request, get_schema_entry(format))
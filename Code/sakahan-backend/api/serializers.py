@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from rest_framework_gis.fields import GeometryField
 from rest_framework_gis.serializers import GeoFeatureModelSerializer
 from djoser.serializers import UserSerializer
+from .geometry import SIMPLIFIED_FIELDS
 from .models import (
     CurrentCrop,
     CurrentCropElement,
@@ -77,12 +79,22 @@ class CurrentCropElementSerializer(serializers.ModelSerializer):
         return representation
 
 
+class SimplifiedGeometryField(GeometryField):
+    # Reads the simplified geometry annotated by simplify_geometry_features when present.
+    def get_attribute(self, instance):
+        if hasattr(instance, "display_geom"):
+            return instance.display_geom
+
+        return super().get_attribute(instance)
+
+
 class CurrentGeometryFeatureSerializer(GeoFeatureModelSerializer):
     published = serializers.BooleanField(required=False)
+    geom = SimplifiedGeometryField()
 
     class Meta:
         model = CurrentGeometryFeature
-        fields = "__all__"
+        exclude = SIMPLIFIED_FIELDS
         geo_field = "geom"  # This tells Django to return `geom` in GeoJSON format
 
 
@@ -92,6 +104,7 @@ class ContributionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contribution
         fields = "__all__"
+        read_only_fields = ["centroid", "bbox"]
 
     def to_representation(self, instance):
         representation = super(ContributionSerializer, self).to_representation(instance)
@@ -115,6 +128,11 @@ class ContributionSerializer(serializers.ModelSerializer):
         return representation
 
 
+# Summary rows for lists; the geometries are only sent on retrieve.
+class ContributionListSerializer(ContributionSerializer):
+    geometries = None
+
+
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comment
@@ -128,21 +146,78 @@ class CommentSerializer(serializers.ModelSerializer):
         return representation
 
 
+MAX_FILES = 5
+MAX_FILE_SIZE = 5 * 1024 * 1024
+FILE_TYPE = "application/pdf"
+
+
 class FileSerializer(serializers.ModelSerializer):
     class Meta:
         model = File
         fields = "__all__"
+        read_only_fields = ["blob"]
 
     def validate(self, data):
-        if File.objects.filter(contribution=data["contribution"]).count() >= 5:
+        if File.objects.filter(contribution=data["contribution"]).count() >= MAX_FILES:
             raise serializers.ValidationError(
                 "Only five PDF can be uploaded per contribution."
             )
         return data
 
     def validate_file(self, value):
-        if value.content_type != "application/pdf":
+        if value.content_type != FILE_TYPE:
             raise serializers.ValidationError("Only PDF files are allowed.")
-        if value.size > 5 * 1024 * 1024:
+        if value.size > MAX_FILE_SIZE:
+            raise serializers.ValidationError("The file size exceeds 5MB.")
+        return value
+
+
+# A PDF the client uploads straight to storage, described the way the `create` form fields describe it.
+class FileUploadSerializer(serializers.Serializer):
+    identifier = serializers.CharField(max_length=255)
+    name = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    type = serializers.CharField(max_length=50)
+    # Required by `presign`, storage rejects an upload that doesn't match it.
+    sha256 = serializers.RegexField(r"^[0-9a-f]{64}$", required=False)
+
+    def validate_type(self, value):
+        if value != FILE_TYPE:
+            raise serializers.ValidationError("Only PDF files are allowed.")
+        return value
+
+    def validate_size(self, value):
+        if value > MAX_FILE_SIZE:
             raise serializers.ValidationError("The file size exceeds 5MB.")
         return value
+
+
+# Every PDF a contribution keeps. Those already uploaded are listed too, the rest are removed.
+class FileUploadListSerializer(serializers.Serializer):
+    files = FileUploadSerializer(many=True, max_length=MAX_FILES)
+
+    def validate_files(self, value):
+        names = [file["name"] for file in value]
+        if len(set(names)) != len(names):
+            raise serializers.ValidationError("File names must be unique.")
+        return value
+
+
+# The same for `create`, where new files come with their content.
+class FileFormSerializer(FileUploadSerializer):
+    file = serializers.FileField(required=False)
+
+    def validate_file(self, value):
+        if value.content_type != FILE_TYPE:
+            raise serializers.ValidationError("Only PDF files are allowed.")
+        if value.size > MAX_FILE_SIZE:
+            raise serializers.ValidationError("The file size exceeds 5MB.")
+        return value
+
+
+class FileFormListSerializer(FileUploadListSerializer):
+    files = FileFormSerializer(many=True, max_length=MAX_FILES)
+
+    # Names only have to be unique for the uploads `presign` stages under them.
+    def validate_files(self, value):
+        return value
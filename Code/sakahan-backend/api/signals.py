@@ -0,0 +1,74 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .cache import invalidate
+from .models import (
+    Contribution,
+    CurrentCrop,
+    CurrentCropElement,
+    CurrentGeometryFeature,
+    LegacyCrop,
+    LegacyCropElement,
+    SuitabilityLevel,
+)
+
+
+# The fields get_code() is built from. Changing any of them renames the map layer.
+LAYER_CODE_FIELDS = {
+    CurrentCrop: ["name"],
+    CurrentCropElement: ["name", "category"],
+}
+
+
+@receiver(pre_save, sender=CurrentCrop)
+@receiver(pre_save, sender=CurrentCropElement)
+def track_layer_code(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._layer_code_changed = False
+        return
+
+    fields = LAYER_CODE_FIELDS[sender]
+    original = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+    instance._layer_code_changed = original is not None and any(
+        original[field] != getattr(instance, sender._meta.get_field(field).attname)
+        for field in fields
+    )
+
+
+@receiver(post_save, sender=CurrentCrop)
+def refresh_crop_layers(sender, instance, created, **kwargs):
+    if getattr(instance, "_layer_code_changed", False):
+        CurrentGeometryFeature.objects.refresh_layers(crops=[instance.id])
+
+
+@receiver(post_save, sender=CurrentCropElement)
+def refresh_crop_element_layers(sender, instance, created, **kwargs):
+    if getattr(instance, "_layer_code_changed", False):
+        CurrentGeometryFeature.objects.refresh_layers(crop_elements=[instance.id])
+
+
+# The cached namespaces each model appears in. Crop elements embed their category, and layer
+# codes are built from both. Geometries are mostly written in bulk without signals, but always
+# together with their contribution.
+NAMESPACES = {
+    LegacyCrop: ["legacy_crops", "legacy_crop_elements"],
+    LegacyCropElement: ["legacy_crop_elements"],
+    SuitabilityLevel: ["suitability_levels"],
+    CurrentCrop: ["current_crops", "current_crop_elements", "geometry_features"],
+    CurrentCropElement: ["current_crop_elements", "geometry_features"],
+    Contribution: ["geometry_features"],
+    CurrentGeometryFeature: ["geometry_features"],
+}
+
+
+def invalidate_namespaces(sender, **kwargs):
+    invalidate(*NAMESPACES[sender])
+
+
+for model in NAMESPACES:
+    post_save.connect(invalidate_namespaces, sender=model)
+
+    # A delete listener makes Django load every geometry deleted with its contribution. The
+    # places that delete geometries invalidate the namespace themselves instead.
+    if model is not CurrentGeometryFeature:
+        post_delete.connect(invalidate_namespaces, sender=model)
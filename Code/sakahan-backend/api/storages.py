@@ -1,6 +1,107 @@
+import base64
 from django.conf import settings
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+
+# How long a client has to start an upload once it is given the form.
+PRESIGNED_POST_EXPIRY = 10 * 60
+# The most keys a DeleteObjects request takes.
+DELETE_BATCH_SIZE = 1000
 
 
 class CustomS3Boto3Storage(S3Boto3Storage):
     location = settings.AWS_MEDIA_LOCATION
+
+    # A form the client posts a file to, straight to the bucket. S3 rejects any other key,
+    # content type or a larger body, so nothing uploaded this way passes through the app.
+    # It also rejects a body that doesn't hash to sha256, and keeps the checksum with the
+    # object for `get_sha256`.
+    def presigned_post(self, name, content_type, max_size, sha256):
+        fields = {
+            "Content-Type": content_type,
+            "x-amz-checksum-algorithm": "SHA256",
+            "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(sha256)).decode(),
+        }
+        if self.default_acl:
+            fields["acl"] = self.default_acl
+        if "CacheControl" in self.object_parameters:
+            fields["Cache-Control"] = self.object_parameters["CacheControl"]
+
+        conditions = [{field: value} for field, value in fields.items()]
+        conditions.append(["content-length-range", 1, max_size])
+
+        return self.bucket.meta.client.generate_presigned_post(
+            self.bucket.name,
+            self._normalize_name(clean_name(name)),
+            Fields=fields,
+            Conditions=conditions,
+            ExpiresIn=PRESIGNED_POST_EXPIRY,
+        )
+
+    # The SHA-256 of the content as S3 verified it on upload, in hex. None if the object
+    # was stored without one.
+    def get_sha256(self, name):
+        response = self.bucket.meta.client.head_object(
+            Bucket=self.bucket.name,
+            Key=self._normalize_name(clean_name(name)),
+            ChecksumMode="ENABLED",
+        )
+        checksum = response.get("ChecksumSHA256")
+
+        # A multipart upload has a checksum of its parts' checksums instead, ending in -<parts>.
+        if not checksum or "-" in checksum:
+            return None
+
+        return base64.b64decode(checksum).hex()
+
+    # Copies within the bucket, so the content isn't downloaded and uploaded again.
+    def copy(self, source, target):
+        parameters = {"ChecksumAlgorithm": "SHA256"}
+        if self.default_acl:
+            parameters["ACL"] = self.default_acl
+
+        self.bucket.meta.client.copy_object(
+            Bucket=self.bucket.name,
+            Key=self._normalize_name(clean_name(target)),
+            CopySource={
+                "Bucket": self.bucket.name,
+                "Key": self._normalize_name(clean_name(source)),
+            },
+            **parameters,
+        )
+
+        return target
+
+    # One request per batch instead of one per file. Returns the error for each name that
+    # couldn't be deleted.
+    def delete_many(self, names):
+        keys = {self._normalize_name(clean_name(name)): name for name in names}
+        objects = [{"Key": key} for key in keys]
+
+        errors = {}
+        for start in range(0, len(objects), DELETE_BATCH_SIZE):
+            batch = objects[start : start + DELETE_BATCH_SIZE]
+            response = self.bucket.delete_objects(
+                Delete={"Objects": batch, "Quiet": True}
+            )
+            for error in response.get("Errors", []):
+                errors[keys[error["Key"]]] = error["Message"]
+
+        return errors
+
+    # Every stored name under the prefix, with when it was last written. One request per
+    # thousand objects rather than one per object.
+    def list_files(self, prefix):
+        prefix = self._normalize_name(clean_name(prefix))
+        location = f"{self.location}/" if self.location else ""
+
+        for summary in self.bucket.objects.filter(Prefix=prefix):
+            yield summary.key.removeprefix(location), summary.last_modified
+
+    # Streams the bytes from start to end, inclusive, without fetching the rest.
+    def iter_range(self, name, start, end, chunk_size):
+        obj = self.bucket.Object(self._normalize_name(clean_name(name)))
+        body = obj.get(Range=f"bytes={start}-{end}")["Body"]
+
+        yield from body.iter_chunks(chunk_size)
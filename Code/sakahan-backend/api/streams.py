@@ -0,0 +1,25 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+
+# Under ASGI, Django reads a sync iterator into a list before sending any of it. Handing it an
+# async iterator that pulls one chunk at a time through sync_to_async keeps the body streamed.
+def streaming_content(iterator):
+    if settings.SERVER_MODE != "asgi":
+        return iterator
+
+    return aiterate(iterator)
+
+
+async def aiterate(iterator):
+    done = object()
+    # Thread sensitive, like the sync views, so a database cursor the iterator holds stays on
+    # the thread that opened it.
+    next_chunk = sync_to_async(next)
+
+    try:
+        while (chunk := await next_chunk(iterator, done)) is not done:
+            yield chunk
+    finally:
+        if hasattr(iterator, "close"):
+            await sync_to_async(iterator.close)()
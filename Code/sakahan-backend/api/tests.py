@@ -1,3 +1,760 @@
-from django.test import TestCase
+import math
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from importlib import import_module, reload
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.gis.geos import Polygon
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection, connections, transaction
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import clear_url_caches
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APITestCase
+from .models import (
+    Blob,
+    Contribution,
+    CurrentCrop,
+    CurrentCropElement,
+    CurrentGeometryFeature,
+    File,
+    StorageDeletion,
+    SuitabilityLevel,
+    UserAccount,
+)
+from .management.commands.process_deletions import SWEEP_GRACE, process_batch, sweep
+from .serializers import FILE_TYPE
+from .downloads import download_response
+from .geometry import MAX_TILE_ZOOM, build_polygons
+from .metrics import WORKERS_KEY, registry
+from .middleware import RequestMetricsMiddleware
+from .streams import streaming_content
+from .views import ContributionViewSet
 
-# Create your tests here.
+
+# Tests don't share cached responses with each other or with a running server.
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+    },
+}
+
+
+class ContributionQueryCountTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.suitability_level = SuitabilityLevel.objects.create(
+            name="Highly suitable", label="S1", gridcode=10, color="#1d6400"
+        )
+        cls.contributor = UserAccount.objects.create_user(
+            email="contributor@sakahan.xyz", first_name="Juan", last_name="Dela Cruz"
+        )
+
+    def create_contributions(self, count):
+        start = Contribution.objects.count()
+
+        for index in range(start, start + count):
+            author = UserAccount.objects.create_user(
+                email=f"author{index}@sakahan.xyz",
+                first_name="Maria",
+                last_name="Clara",
+            )
+            crop = CurrentCrop.objects.create(name=f"Crop {index}")
+            crop_element = CurrentCropElement.objects.create(
+                name=f"Element {index}", category=crop
+            )
+            contribution = Contribution.objects.create(
+                author=author,
+                title=f"Contribution {index}",
+                address="Los Baños, Laguna",
+                description="Test contribution",
+                crop=crop,
+                crop_element=crop_element,
+                suitability_level=self.suitability_level,
+            )
+            contribution.contributors.add(self.contributor)
+
+            for offset in range(3):
+                CurrentGeometryFeature.objects.create(
+                    gridcode=self.suitability_level.gridcode,
+                    layer=crop_element.get_code(),
+                    reference=contribution,
+                    geom=Polygon.from_bbox((121 + offset, 14, 121.5 + offset, 14.5)),
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_list_query_count_is_constant(self):
+        self.create_contributions(1)
+        single_count, _ = self.count_queries("/api/contributions/")
+
+        self.create_contributions(9)
+        page_count, response = self.count_queries("/api/contributions/")
+
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(page_count, single_count)
+
+    def test_retrieve_query_count_is_constant(self):
+        self.create_contributions(1)
+        contribution = Contribution.objects.get()
+
+        with self.assertNumQueries(3):
+            self.client.get(f"/api/contributions/{contribution.id}/")
+
+    # The records panel walks the list through the `next` and `previous` links.
+    def test_cursor_pages_follow_each_other(self):
+        self.create_contributions(15)
+        # Published at the same instant, so the id decides the order.
+        Contribution.objects.update(date_published=timezone.now())
+        expected = list(
+            Contribution.objects.order_by("-date_published", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            first = self.client.get("/api/contributions/").data
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in context.captured_queries)
+        )
+        self.assertNotIn("count", first)
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(first["next"]).data
+        self.assertIsNone(second["next"])
+        self.assertEqual(
+            [item["id"] for item in first["results"] + second["results"]], expected
+        )
+
+        previous = self.client.get(second["previous"]).data
+        self.assertEqual(
+            [item["id"] for item in previous["results"]],
+            [item["id"] for item in first["results"]],
+        )
+
+    def test_count_is_opt_in(self):
+        self.create_contributions(3)
+
+        response = self.client.get("/api/contributions/?count=true")
+
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 3)
+
+
+# The committed schema is the production one; development mode changes the tags.
+@override_settings(DEVELOPMENT_MODE=False)
+class SchemaDriftTest(SimpleTestCase):
+    def test_schema_file_is_up_to_date(self):
+        call_command("build_schema", check=True)
+
+
+def tile_for(z, lon, lat):
+    n = 2**z
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+
+    return x, y
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CurrentGeometryFeatureTileTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        suitability_level = SuitabilityLevel.objects.create(
+            name="Highly suitable", label="S1", gridcode=10, color="#1d6400"
+        )
+        author = UserAccount.objects.create_user(
+            email="author@sakahan.xyz", first_name="Maria", last_name="Clara"
+        )
+        cls.contribution = Contribution.objects.create(
+            author=author,
+            title="Contribution",
+            address="Los Baños, Laguna",
+            description="Test contribution",
+            suitability_level=suitability_level,
+        )
+        CurrentGeometryFeature.objects.create(
+            gridcode=suitability_level.gridcode,
+            layer="rice_grain",
+            reference=cls.contribution,
+            geom=Polygon.from_bbox((121, 14, 121.5, 14.5)),
+        )
+
+    def tile_url(self, z, x, y):
+        return f"/api/current/geometry-features/tiles/{z}/{x}/{y}.mvt"
+
+    def test_deleted_feature_is_no_longer_served(self):
+        x, y = tile_for(6, 121.25, 14.25)
+        feature = self.contribution.geometries.get()
+        self.assertIn(b"reference", self.client.get(self.tile_url(6, x, y)).content)
+        self.assertEqual(
+            len(self.client.get("/api/current/geometry-features/").json()["features"]),
+            1,
+        )
+
+        self.client.force_authenticate(self.contribution.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(
+                f"/api/current/geometry-features/{feature.id}/"
+            )
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(self.client.get(self.tile_url(6, x, y)).content, b"")
+        self.assertEqual(
+            self.client.get("/api/current/geometry-features/").json()["features"], []
+        )
+
+    def test_tile_names_the_reference_attribute(self):
+        x, y = tile_for(6, 121.25, 14.25)
+        response = self.client.get(self.tile_url(6, x, y))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/vnd.mapbox-vector-tile")
+        self.assertIn(b"reference", response.content)
+        self.assertNotIn(b"reference_id", response.content)
+
+    def test_empty_tile(self):
+        x, y = tile_for(6, -120, 40)
+        response = self.client.get(self.tile_url(6, x, y))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+
+    def test_tiles_outside_the_grid_are_json_errors(self):
+        for z, x, y in [(MAX_TILE_ZOOM + 1, 0, 0), (2, 4, 0), (2, 0, 4)]:
+            response = self.client.get(self.tile_url(z, x, y))
+
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response["Content-Type"], "application/json")
+
+
+class StreamingContentTest(SimpleTestCase):
+    @override_settings(SERVER_MODE="wsgi")
+    def test_sync_iterator_is_kept_under_wsgi(self):
+        chunks = iter(["a", "b"])
+
+        self.assertIs(streaming_content(chunks), chunks)
+
+    @override_settings(SERVER_MODE="asgi")
+    async def test_chunks_are_pulled_one_at_a_time_under_asgi(self):
+        pulled = []
+
+        def chunks():
+            for index in range(3):
+                pulled.append(index)
+                yield str(index)
+
+        content = streaming_content(chunks())
+        self.assertTrue(StreamingHttpResponse(content).is_async)
+
+        self.assertEqual(await anext(content), "0")
+        self.assertEqual(pulled, [0])
+        self.assertEqual([chunk async for chunk in content], ["1", "2"])
+
+
+class ServerTimingTest(SimpleTestCase):
+    def get_response(self, user):
+        request = RequestFactory().get("/api/")
+        request.user = user
+
+        return RequestMetricsMiddleware(lambda request: HttpResponse())(request)
+
+    @override_settings(DEBUG=False)
+    def test_hidden_from_other_users(self):
+        response = self.get_response(AnonymousUser())
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(DEBUG=False)
+    def test_shown_to_staff(self):
+        response = self.get_response(UserAccount(is_staff=True))
+
+        self.assertIn("app;dur=", response["Server-Timing"])
+
+    @override_settings(DEBUG=True)
+    def test_shown_in_debug(self):
+        response = self.get_response(AnonymousUser())
+
+        self.assertIn("app;dur=", response["Server-Timing"])
+
+
+@override_settings(
+    CACHES={
+        **TEST_CACHES,
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "api_cache",
+        },
+    },
+    DEBUG=False,
+)
+class AsyncRequestMetricsTest(TestCase):
+    def setUp(self):
+        call_command("createcachetable", verbosity=0)
+        # Due to be flushed on the next request.
+        registry.flushed = 0
+
+    async def test_flushed_to_the_database_cache(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        request = RequestFactory().get("/api/")
+        request.user = AnonymousUser()
+
+        response = await RequestMetricsMiddleware(get_response)(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(os.getpid(), await caches["default"].aget(WORKERS_KEY))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CurrentCropElementCategoryTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.crop = CurrentCrop.objects.create(name="Rice")
+        CurrentCropElement.objects.create(name="Grain", category=cls.crop)
+
+    def test_lists_the_category(self):
+        response = self.client.get(
+            f"/api/current/crops-elements/category/?category={self.crop.id}"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([element["name"] for element in response.json()], ["Grain"])
+
+    def test_category_must_be_an_integer(self):
+        for category in ["", "rice", "1.5", "1;DROP"]:
+            response = self.client.get(
+                f"/api/current/crops-elements/category/?category={category}"
+            )
+
+            self.assertEqual(response.status_code, 400)
+
+    def test_unknown_category(self):
+        response = self.client.get(
+            f"/api/current/crops-elements/category/?category={self.crop.id + 1}"
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
+def reload_urls():
+    # The async routes are chosen when the urlconf is imported.
+    reload(import_module("api.urls"))
+    reload(import_module("sakahan_backend.urls"))
+    clear_url_caches()
+
+
+@override_settings(ASYNC_VIEWS=True)
+class AsyncViewCsrfTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        reload_urls()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        reload_urls()
+
+    def test_post_reaches_the_fallback(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_authenticate(
+            UserAccount.objects.create_user(
+                email="contributor@sakahan.xyz",
+                first_name="Juan",
+                last_name="Dela Cruz",
+            )
+        )
+
+        response = client.post("/api/contributions/", {}, format="json")
+
+        self.assertEqual(
+            response.resolver_match.func.view_class.__name__,
+            "AsyncContributionListView",
+        )
+        # Rejected by the serializer rather than by CsrfViewMiddleware.
+        self.assertEqual(response.status_code, 400)
+
+
+class LocalStorageMixin:
+    # Each test stores its files in a directory of its own.
+    def setUp(self):
+        super().setUp()
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+
+        storages = override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                "default": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": location},
+                },
+            }
+        )
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+
+def create_contribution(author, **kwargs):
+    crop = CurrentCrop.objects.create(name="Rice")
+
+    return Contribution.objects.create(
+        author=author,
+        title="Contribution",
+        address="Los Baños, Laguna",
+        description="Test contribution",
+        crop=crop,
+        crop_element=CurrentCropElement.objects.create(name="Grain", category=crop),
+        suitability_level=SuitabilityLevel.objects.create(
+            name="Highly suitable", label="S1", gridcode=10, color="#1d6400"
+        ),
+        **kwargs,
+    )
+
+
+class StorageDeletionTest(LocalStorageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = UserAccount.objects.create_user(
+            email="contributor@sakahan.xyz", first_name="Juan", last_name="Dela Cruz"
+        )
+        cls.contribution = create_contribution(cls.user)
+
+    def store(self, content):
+        return Blob.store(ContentFile(content, name="report.pdf"))
+
+    def create_file(self, blob, identifier):
+        return File.objects.create(
+            contribution=self.contribution,
+            uploaded_by=self.user,
+            blob=blob,
+            file=blob.file.name,
+            file_identifier=identifier,
+            file_name=f"{identifier}.pdf",
+            file_size=blob.size,
+            file_type=FILE_TYPE,
+        )
+
+    def test_deleted_file_is_removed_from_storage(self):
+        file = self.create_file(self.store(b"%PDF report"), "report")
+        name = file.file.name
+
+        file.delete()
+
+        self.assertFalse(Blob.objects.exists())
+        self.assertTrue(StorageDeletion.objects.filter(name=name).exists())
+        self.assertTrue(default_storage.exists(name))
+
+        self.assertEqual(process_batch(10), 1)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StorageDeletion.objects.exists())
+
+    def test_shared_content_is_kept(self):
+        blob = self.store(b"%PDF report")
+        file = self.create_file(blob, "report")
+        self.create_file(blob, "copy")
+
+        file.delete()
+
+        self.assertTrue(Blob.objects.filter(id=blob.id).exists())
+        self.assertFalse(StorageDeletion.objects.exists())
+        self.assertTrue(default_storage.exists(blob.file.name))
+
+    def test_referenced_name_is_never_deleted(self):
+        blob = self.store(b"%PDF report")
+        self.create_file(blob, "report")
+        StorageDeletion.enqueue([blob.file.name])
+
+        self.assertEqual(process_batch(10), 1)
+        self.assertTrue(default_storage.exists(blob.file.name))
+        self.assertFalse(StorageDeletion.objects.exists())
+
+    def test_failed_delete_is_retried_later(self):
+        # A directory that isn't empty can't be deleted like a file.
+        name = "contributions/stuck.pdf"
+        default_storage.save(f"{name}/part", ContentFile(b"%PDF"))
+        StorageDeletion.enqueue([name])
+
+        self.assertEqual(process_batch(10), 1)
+        deletion = StorageDeletion.objects.get(name=name)
+        self.assertEqual(deletion.attempts, 1)
+        self.assertTrue(deletion.last_error)
+        self.assertGreater(deletion.next_attempt, timezone.now())
+
+        # Not due yet.
+        self.assertEqual(process_batch(10), 0)
+
+        default_storage.delete(f"{name}/part")
+        StorageDeletion.objects.update(next_attempt=timezone.now())
+
+        self.assertEqual(process_batch(10), 1)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StorageDeletion.objects.exists())
+
+    def test_storing_cancels_a_queued_deletion(self):
+        file = self.create_file(self.store(b"%PDF report"), "report")
+        name = file.file.name
+        file.delete()
+
+        blob = self.store(b"%PDF report")
+
+        self.assertEqual(blob.file.name, name)
+        self.assertFalse(StorageDeletion.objects.exists())
+        self.assertEqual(process_batch(10), 0)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_sweep_queues_orphans(self):
+        old = (timezone.now() - SWEEP_GRACE - timedelta(hours=1)).timestamp()
+
+        referenced = self.store(b"%PDF report")
+        self.create_file(referenced, "report")
+        unreferenced = self.store(b"%PDF draft")
+        Blob.objects.filter(id=unreferenced.id).update(
+            date_created=timezone.now() - SWEEP_GRACE - timedelta(hours=1)
+        )
+        orphan = default_storage.save(
+            "contributions/1/pdfs/orphan.pdf", ContentFile(b"%PDF")
+        )
+        # Too new for the sweep, it may be an upload that isn't confirmed yet.
+        default_storage.save("contributions/1/pdfs/recent.pdf", ContentFile(b"%PDF"))
+        for name in [referenced.file.name, unreferenced.file.name, orphan]:
+            os.utime(default_storage.path(name), (old, old))
+
+        sweep()
+
+        self.assertFalse(Blob.objects.filter(id=unreferenced.id).exists())
+        self.assertEqual(
+            set(StorageDeletion.objects.values_list("name", flat=True)),
+            {unreferenced.file.name, orphan},
+        )
+
+
+class StorageDeletionLockTest(LocalStorageMixin, TransactionTestCase):
+    def test_locked_deletions_are_skipped(self):
+        StorageDeletion.enqueue(["contributions/a.pdf", "contributions/b.pdf"])
+        processed = []
+
+        # Another worker, with a connection of its own.
+        def work():
+            try:
+                processed.append(process_batch(10))
+            finally:
+                connections.close_all()
+
+        with transaction.atomic():
+            StorageDeletion.objects.select_for_update().get(name="contributions/a.pdf")
+            worker = threading.Thread(target=work)
+            worker.start()
+            worker.join()
+
+        self.assertEqual(processed, [1])
+        self.assertEqual(
+            list(StorageDeletion.objects.values_list("name", flat=True)),
+            ["contributions/a.pdf"],
+        )
+
+
+class DownloadResponseTest(LocalStorageMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        name = default_storage.save(
+            "contributions/1/pdfs/report.pdf", ContentFile(b"0123456789")
+        )
+        # A file from before blobs, whose size is read from the storage.
+        self.file = File(
+            id=1,
+            file=name,
+            file_name="report.pdf",
+            file_type=FILE_TYPE,
+            date_uploaded=timezone.now() - timedelta(hours=1),
+        )
+
+    def get(self, **headers):
+        request = RequestFactory().get("/api/files/1/download/", headers=headers)
+
+        return download_response(request, self.file, public=True)
+
+    def test_whole_file(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+    def test_range(self):
+        for header, content, content_range in [
+            ("bytes=2-5", b"2345", "bytes 2-5/10"),
+            ("bytes=7-", b"789", "bytes 7-9/10"),
+            ("bytes=-3", b"789", "bytes 7-9/10"),
+            ("bytes=8-100", b"89", "bytes 8-9/10"),
+        ]:
+            response = self.get(range=header)
+
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response["Content-Range"], content_range)
+            self.assertEqual(b"".join(response.streaming_content), content)
+
+    def test_unsatisfiable_range(self):
+        for header in ["bytes=10-", "bytes=-0"]:
+            response = self.get(range=header)
+
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_range_of_an_empty_file(self):
+        default_storage.delete(self.file.file.name)
+        default_storage.save(self.file.file.name, ContentFile(b""))
+
+        response = self.get(range="bytes=-5")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */0")
+
+    def test_if_range(self):
+        etag = self.get()["ETag"]
+
+        response = self.get(range="bytes=2-5", if_range=etag)
+        self.assertEqual(response.status_code, 206)
+
+        # The client's copy is outdated, so it gets the whole file.
+        response = self.get(range="bytes=2-5", if_range='"file-2"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+    def test_not_modified(self):
+        etag = self.get()["ETag"]
+
+        response = self.get(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(SERVER_MODE="asgi")
+    async def test_streamed_asynchronously_under_asgi(self):
+        response = await sync_to_async(self.get)(range="bytes=2-5")
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(
+            b"".join([chunk async for chunk in response.streaming_content]), b"2345"
+        )
+
+
+class FileDownloadTest(LocalStorageMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = UserAccount.objects.create_user(
+            email="author@sakahan.xyz", first_name="Maria", last_name="Clara"
+        )
+        cls.contribution = create_contribution(cls.author)
+
+    def setUp(self):
+        super().setUp()
+        blob = Blob.store(ContentFile(b"%PDF report", name="report.pdf"))
+        self.file = File.objects.create(
+            contribution=self.contribution,
+            uploaded_by=self.author,
+            blob=blob,
+            file=blob.file.name,
+            file_identifier="report",
+            file_name="report.pdf",
+            file_size=blob.size,
+            file_type=FILE_TYPE,
+        )
+
+    def test_author_can_download(self):
+        self.client.force_authenticate(self.author)
+
+        response = self.client.get(f"/api/files/{self.file.id}/download/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF report")
+
+    def test_others_cannot_download_a_pending_contribution(self):
+        self.client.force_authenticate(
+            UserAccount.objects.create_user(
+                email="other@sakahan.xyz", first_name="Jose", last_name="Rizal"
+            )
+        )
+
+        response = self.client.get(f"/api/files/{self.file.id}/download/")
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+
+class BuildPolygonsTest(SimpleTestCase):
+    def test_self_intersecting_ring_is_split(self):
+        polygons = build_polygons([[(0, 0), (1, 1), (1, 0), (0, 1), (0, 0)]])
+
+        self.assertEqual(len(polygons), 2)
+        self.assertTrue(all(polygon.valid for polygon in polygons))
+
+    def test_ring_without_area(self):
+        # Folds back onto itself, so it is repaired into a line.
+        with self.assertRaises(ValidationError) as context:
+            build_polygons([[(0, 0), (1, 0), (0, 0), (1, 0), (0, 0)]])
+
+        self.assertEqual(
+            context.exception.detail, {"geom": {0: "The polygon has no area."}}
+        )
+
+
+class SaveGeometriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.contribution = create_contribution(
+            UserAccount.objects.create_user(
+                email="author@sakahan.xyz", first_name="Maria", last_name="Clara"
+            ),
+            status=Contribution.Status.REJECTED,
+        )
+        cls.kept = Polygon.from_bbox((121, 14, 121.5, 14.5))
+        cls.kept.srid = 4326
+        cls.added = Polygon.from_bbox((122, 14, 122.5, 14.5))
+        cls.added.srid = 4326
+
+    def save_geometries(self, polygons):
+        ContributionViewSet().save_geometries(self.contribution, polygons)
+
+        return list(self.contribution.geometries.values_list("published", flat=True))
+
+    def test_features_follow_the_status(self):
+        # Written before the contribution was rejected.
+        CurrentGeometryFeature.objects.create(
+            gridcode=self.contribution.suitability_level.gridcode,
+            layer=self.contribution.get_layer(),
+            reference=self.contribution,
+            geom=self.kept,
+            published=True,
+        )
+
+        self.assertEqual(self.save_geometries([self.kept, self.added]), [False, False])
+
+        self.contribution.status = Contribution.Status.APPROVED
+        self.assertEqual(self.save_geometries([self.kept, self.added]), [True, True])
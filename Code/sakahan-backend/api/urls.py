@@ -1,12 +1,21 @@
+from django.conf import settings
 from django.urls import path, include, re_path
 from rest_framework import routers
+from .async_views import (
+    AsyncBootstrapView,
+    AsyncCatalogListView,
+    AsyncContributionListView,
+    AsyncGeometryFeatureListView,
+)
+from .lazy import LazyView
 from .views import (
+    BootstrapView,
     CommentViewSet,
     ContributionViewSet,
     CurrentCropElementViewSet,
     CurrentCropViewSet,
+    CurrentGeometryFeatureTileView,
     CurrentGeometryFeatureViewSet,
-    CustomProviderAuthView,
     CustomTokenObtainPairView,
     CustomTokenRefreshView,
     CustomTokenVerifyView,
@@ -14,6 +23,7 @@ from .views import (
     LogoutView,
     LegacyCropViewSet,
     LegacyCropElementViewSet,
+    MetricsView,
     SuitabilityLevelViewSet,
 )
 
@@ -48,14 +58,59 @@ router.register("files", FileViewSet, basename="files")
 urlpatterns = [
     re_path(
         r"^o/(?P<provider>\S+)/$",
-        CustomProviderAuthView.as_view(),
+        LazyView("api.social.CustomProviderAuthView"),
         name="provider-auth",
     ),
+    path("_metrics", MetricsView.as_view(), name="metrics"),
+    path("bootstrap/", BootstrapView.as_view(), name="bootstrap"),
     path("", include(router.urls)),
     path("legacy/", include(legacy_router.urls)),
+    path(
+        "current/geometry-features/tiles/<int:z>/<int:x>/<int:y>.mvt",
+        CurrentGeometryFeatureTileView.as_view(),
+        name="current_geometry_features_tiles",
+    ),
     path("current/", include(current_router.urls)),
     path("jwt/create/", CustomTokenObtainPairView.as_view()),
     path("jwt/refresh/", CustomTokenRefreshView.as_view()),
     path("jwt/verify/", CustomTokenVerifyView.as_view()),
     path("logout/", LogoutView.as_view()),
 ]
+
+# Under ASGI the busiest read endpoints are served by async views, which must come before the
+# routers to take their place.
+if settings.ASYNC_VIEWS is True:
+
+    def async_catalog_list(viewset):
+        actions = {"get": "list"}
+        if hasattr(viewset, "create"):
+            actions["post"] = "create"
+
+        return AsyncCatalogListView.as_view(
+            viewset=viewset, fallback=viewset.as_view(actions)
+        )
+
+    urlpatterns = [
+        path(
+            "bootstrap/", AsyncBootstrapView.as_view(fallback=BootstrapView.as_view())
+        ),
+        path("legacy/crops/", async_catalog_list(LegacyCropViewSet)),
+        path("legacy/crops-elements/", async_catalog_list(LegacyCropElementViewSet)),
+        path("current/crops/", async_catalog_list(CurrentCropViewSet)),
+        path("current/crops-elements/", async_catalog_list(CurrentCropElementViewSet)),
+        path("suitability-levels/", async_catalog_list(SuitabilityLevelViewSet)),
+        path(
+            "current/geometry-features/",
+            AsyncGeometryFeatureListView.as_view(
+                fallback=CurrentGeometryFeatureViewSet.as_view(
+                    {"get": "list", "post": "create"}
+                )
+            ),
+        ),
+        path(
+            "contributions/",
+            AsyncContributionListView.as_view(
+                fallback=ContributionViewSet.as_view({"get": "list", "post": "create"})
+            ),
+        ),
+    ] + urlpatterns
@@ -1,11 +1,14 @@
-import json
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from djoser.social.views import ProviderAuthView
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import status, permissions, viewsets
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.views import (
@@ -15,6 +18,7 @@ from rest_framework_simplejwt.views import (
 )
 from api.serializers import (
     CommentSerializer,
+    ContributionListSerializer,
     ContributionSerializer,
     CurrentCropElementSerializer,
     CurrentCropSerializer,
@@ -23,6 +27,10 @@ from api.serializers import (
     LegacyCropElementSerializer,
     SuitabilityLevelSerializer,
     FileSerializer,
+    FileFormListSerializer,
+    FileUploadListSerializer,
+    FILE_TYPE,
+    MAX_FILE_SIZE,
 )
 from api.models import (
     Comment,
@@ -33,16 +41,39 @@ from api.models import (
     LegacyCrop,
     LegacyCropElement,
     SuitabilityLevel,
+    Blob,
     File,
+    delete_files,
 )
+import logging
 from enum import Enum
+from django.db.models import Prefetch
 from django.db.models.functions import TruncDate
 from collections import defaultdict
-from django.contrib.gis.geos import GEOSGeometry
 from django.db import transaction
+from api.filters import filter_geometry_features, simplify_geometry_features
+from api.cache import (
+    CachedCatalogMixin,
+    cached,
+    catalog_response,
+    get_bundle_entry,
+    invalidate,
+)
+from api.geometry import (
+    build_polygons,
+    build_tile,
+    is_valid_tile,
+    stream_feature_collection,
+)
+from api.pagination import ContributionPagination
+from api.metrics import registry, render_metrics
+from api.renderers import GeoJSONRenderer, MVTRenderer, PDFRenderer, PrometheusRenderer
+from api.downloads import download_response
+from api.streams import streaming_content
 
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class RecordTab(Enum):
@@ -66,34 +97,47 @@ class RecordStatus(Enum):
         return mapping.get(self, None)
 
 
-class CustomProviderAuthView(ProviderAuthView):
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-
-        if response.status_code == status.HTTP_201_CREATED:
-            access_token = response.data.get("access")
-            refresh_token = response.data.get("refresh")
-
-            response.set_cookie(
-                "access",
-                access_token,
-                max_age=settings.AUTH_COOKIE_MAX_AGE,
-                path=settings.AUTH_COOKIE_PATH,
-                secure=settings.AUTH_COOKIE_SECURE,
-                httponly=settings.AUTH_COOKIE_HTTP_ONLY,
-                samesite=settings.AUTH_COOKIE_SAMESITE,
-            )
-            response.set_cookie(
-                "refresh",
-                refresh_token,
-                max_age=settings.AUTH_COOKIE_MAX_AGE,
-                path=settings.AUTH_COOKIE_PATH,
-                secure=settings.AUTH_COOKIE_SECURE,
-                httponly=settings.AUTH_COOKIE_HTTP_ONLY,
-                samesite=settings.AUTH_COOKIE_SAMESITE,
-            )
-
-        return response
+GEOMETRY_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        name="bbox",
+        description="Filter by bounding box: min_lon,min_lat,max_lon,max_lat",
+        required=False,
+        type=str,
+    ),
+    OpenApiParameter(
+        name="layer",
+        description="Filter by layer code: <crop_code> or <crop_element_code>",
+        required=False,
+        type=str,
+    ),
+    OpenApiParameter(
+        name="published",
+        description="Filter by published flag: 'true' or 'false'",
+        required=False,
+        type=bool,
+    ),
+    OpenApiParameter(
+        name="gridcode__in",
+        description="Filter by comma-separated suitability level gridcodes",
+        required=False,
+        type=str,
+    ),
+]
+
+GEOMETRY_SIMPLIFICATION_PARAMETERS = [
+    OpenApiParameter(
+        name="zoom",
+        description="Simplify geometries for the given map zoom level",
+        required=False,
+        type=int,
+    ),
+    OpenApiParameter(
+        name="tolerance",
+        description="Simplify geometries with the given tolerance in degrees",
+        required=False,
+        type=float,
+    ),
+]
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -170,10 +214,11 @@ class LogoutView(APIView):
         return response
 
 
-class LegacyCropViewSet(viewsets.ReadOnlyModelViewSet):
+class LegacyCropViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
     queryset = LegacyCrop.objects.all()
     serializer_class = LegacyCropSerializer
     pagination_class = None
+    catalog = "legacy_crops"
 
     def get_permissions(self):
         self.permission_classes = [permissions.IsAuthenticated]
@@ -184,10 +229,11 @@ class LegacyCropViewSet(viewsets.ReadOnlyModelViewSet):
         return super().get_permissions()
 
 
-class LegacyCropElementViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = LegacyCropElement.objects.all()
+class LegacyCropElementViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = LegacyCropElement.objects.select_related("category")
     serializer_class = LegacyCropElementSerializer
     pagination_class = None
+    catalog = "legacy_crop_elements"
 
     def get_permissions(self):
         self.permission_classes = [permissions.IsAuthenticated]
@@ -198,17 +244,19 @@ class LegacyCropElementViewSet(viewsets.ReadOnlyModelViewSet):
         return super().get_permissions()
 
 
-class SuitabilityLevelViewSet(viewsets.ReadOnlyModelViewSet):
+class SuitabilityLevelViewSet(CachedCatalogMixin, viewsets.ReadOnlyModelViewSet):
     queryset = SuitabilityLevel.objects.all()
     serializer_class = SuitabilityLevelSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
+    catalog = "suitability_levels"
 
 
-class CurrentCropViewSet(viewsets.ModelViewSet):
+class CurrentCropViewSet(CachedCatalogMixin, viewsets.ModelViewSet):
     queryset = CurrentCrop.objects.all().order_by("name")
     serializer_class = CurrentCropSerializer
     pagination_class = None
+    catalog = "current_crops"
 
     def get_permissions(self):
         self.permission_classes = [permissions.IsAuthenticated]
@@ -219,10 +267,11 @@ class CurrentCropViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
 
-class CurrentCropElementViewSet(viewsets.ModelViewSet):
-    queryset = CurrentCropElement.objects.all()
+class CurrentCropElementViewSet(CachedCatalogMixin, viewsets.ModelViewSet):
+    queryset = CurrentCropElement.objects.select_related("category")
     serializer_class = CurrentCropElementSerializer
     pagination_class = None
+    catalog = "current_crop_elements"
 
     def get_permissions(self):
         self.permission_classes = [permissions.IsAuthenticated]
@@ -249,16 +298,60 @@ class CurrentCropElementViewSet(viewsets.ModelViewSet):
     def category(self, request):
         category = request.query_params.get("category", None)
 
-        if category:
-            crop_elements = CurrentCropElement.objects.filter(category=category)
-            serializer = CurrentCropElementSerializer(crop_elements, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
+        if not category:
             return Response(
                 {"error": "Category parameter is required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        try:
+            category = int(category)
+        except ValueError:
+            return Response(
+                {"error": "Category must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        def build():
+            # Raised before anything is cached, so only existing categories take up entries.
+            if not CurrentCrop.objects.filter(id=category).exists():
+                raise NotFound("Category does not exist.")
+
+            crop_elements = self.get_queryset().filter(category=category)
+            return CurrentCropElementSerializer(crop_elements, many=True).data
+
+        return self.get_cached_response(request, f"category:{category}", build)
+
+
+# Everything the map needs on startup, in the order the separate catalog endpoints list it.
+BOOTSTRAP_CATALOGS = [
+    LegacyCropViewSet,
+    LegacyCropElementViewSet,
+    CurrentCropViewSet,
+    CurrentCropElementViewSet,
+    SuitabilityLevelViewSet,
+]
+
+
+class BootstrapView(APIView):
+    # The catalogs are public, so the token is not even looked at.
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        entry = get_bundle_entry(
+            "bootstrap",
+            {
+                viewset.catalog: lambda viewset=viewset: viewset.serializer_class(
+                    viewset.queryset.all(), many=True
+                ).data
+                for viewset in BOOTSTRAP_CATALOGS
+            },
+        )
+
+        return catalog_response(request, entry)
+
 
 class CurrentGeometryFeatureViewSet(viewsets.ModelViewSet):
     queryset = CurrentGeometryFeature.objects.all()
@@ -268,15 +361,90 @@ class CurrentGeometryFeatureViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         self.permission_classes = [permissions.IsAuthenticated]
 
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "export"]:
             self.permission_classes = [permissions.AllowAny]
 
         return super().get_permissions()
 
+    def get_queryset(self):
+        queryset = CurrentGeometryFeature.objects.all()
+        queryset = filter_geometry_features(queryset, self.request.query_params)
+
+        return simplify_geometry_features(queryset, self.request.query_params)
+
+    # Deleting a feature sends no signal, see api/signals.py.
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidate("geometry_features")
+
+    @extend_schema(
+        parameters=GEOMETRY_FILTER_PARAMETERS + GEOMETRY_SIMPLIFICATION_PARAMETERS
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    # Same filters as list, but streamed so memory stays flat regardless of the table size.
+    @extend_schema(
+        parameters=GEOMETRY_FILTER_PARAMETERS + GEOMETRY_SIMPLIFICATION_PARAMETERS,
+        responses={(200, GeoJSONRenderer.media_type): OpenApiTypes.OBJECT},
+    )
+    @action(detail=False, renderer_classes=[GeoJSONRenderer])
+    def export(self, request):
+        response = StreamingHttpResponse(
+            streaming_content(stream_feature_collection(self.get_queryset())),
+            content_type=GeoJSONRenderer.media_type,
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="current_geometry_features.geojson"'
+        )
+
+        return response
+
+
+class CurrentGeometryFeatureTileView(APIView):
+    permission_classes = [permissions.AllowAny]
+    renderer_classes = [MVTRenderer]
+
+    @extend_schema(
+        parameters=GEOMETRY_FILTER_PARAMETERS,
+        responses={
+            (200, MVTRenderer.media_type): OpenApiTypes.BINARY,
+        },
+    )
+    def get(self, request, z, x, y):
+        if not is_valid_tile(z, x, y):
+            raise NotFound("Tile does not exist.")
+
+        return Response(self.get_tile(request, z, x, y), status=status.HTTP_200_OK)
+
+    @cached(
+        "geometry_features",
+        lambda self, request, z, x, y: f"tile:{z}/{x}/{y}?{request.GET.urlencode()}",
+    )
+    def get_tile(self, request, z, x, y):
+        queryset = filter_geometry_features(
+            CurrentGeometryFeature.objects.all(), request.query_params
+        )
+
+        return build_tile(queryset, z, x, y, name="current_geometry_features")
+
+
+class MetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    @extend_schema(responses={(200, PrometheusRenderer.media_type): OpenApiTypes.STR})
+    def get(self, request):
+        response = Response(render_metrics(*registry.collect()))
+        response["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+
+        return response
+
 
 class ContributionViewSet(viewsets.ModelViewSet):
-    queryset = Contribution.objects.all().order_by("-date_published")
+    queryset = Contribution.objects.all().order_by("-date_published", "-id")
     serializer_class = ContributionSerializer
+    pagination_class = ContributionPagination
 
     def get_permissions(self):
         self.permission_classes = [permissions.IsAuthenticated]
@@ -286,8 +454,36 @@ class ContributionViewSet(viewsets.ModelViewSet):
 
         return super().get_permissions()
 
+    # Lists only embed geometries when asked with ?expand=geometries.
+    def expand_geometries(self):
+        expand = self.request.query_params.get("expand", "").split(",")
+
+        return self.action != "list" or "geometries" in expand
+
+    def get_serializer_class(self):
+        if not self.expand_geometries():
+            return ContributionListSerializer
+
+        return super().get_serializer_class()
+
     def get_queryset(self):
-        queryset = Contribution.objects.all().order_by("-date_published")
+        # Everything ContributionSerializer nests is loaded up front to avoid per-row queries.
+        queryset = (
+            Contribution.objects.all()
+            .select_related(
+                "author", "crop", "crop_element__category", "suitability_level"
+            )
+            .prefetch_related(Prefetch("contributors", queryset=User.objects.all()))
+            .order_by("-date_published", "-id")
+        )
+        if self.expand_geometries():
+            geometries = simplify_geometry_features(
+                CurrentGeometryFeature.objects.all(), self.request.query_params
+            )
+            queryset = queryset.prefetch_related(
+                Prefetch("geometries", queryset=geometries)
+            )
+
         tab = self.request.query_params.get("tab")
         filter = self.request.query_params.get("filter")
         user = self.request.query_params.get("user")
@@ -322,11 +518,23 @@ class ContributionViewSet(viewsets.ModelViewSet):
                 type=str,
                 enum=[status.value for status in RecordStatus],
             ),
+            OpenApiParameter(
+                name="expand",
+                description="Embed related data in each row: 'geometries'",
+                required=False,
+                type=str,
+                enum=["geometries"],
+            ),
         ]
+        + GEOMETRY_SIMPLIFICATION_PARAMETERS
     )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(parameters=GEOMETRY_SIMPLIFICATION_PARAMETERS)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
 
@@ -411,45 +619,21 @@ class ContributionViewSet(viewsets.ModelViewSet):
                 request._full_data = data
 
                 return super().create(request, *args, **kwargs)
-        except Exception as e:
+        except ValidationError:
+            raise
+        except Exception:
+            logger.exception("Failed to create contribution")
             return Response(
                 {"detail": "Something went wrong."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
     def perform_create(self, serializer):
+        # Reject bad polygons before anything is written.
+        polygons = build_polygons(self.request.data.get("geom"))
         contribution = serializer.save()
 
-        crop = contribution.crop
-        crop_element = contribution.crop_element
-        suitability_level = contribution.suitability_level
-        geom = self.request.data.get("geom")
-
-        properties = {
-            "gridcode": suitability_level.gridcode,
-            "layer": crop_element.get_code() if crop_element else crop.get_code(),
-            "reference": contribution.id,
-        }
-
-        for polygon in geom:
-            geojson_polygon = {
-                "type": "Polygon",
-                "coordinates": [polygon],  # must be nested in a list
-            }
-
-            # Convert to JSON string before passing to GEOSGeometry
-            geometry = GEOSGeometry(json.dumps(geojson_polygon))
-
-            feature_data = {"geom": geometry, **properties}
-            feature_serializer = CurrentGeometryFeatureSerializer(data=feature_data)
-            if feature_serializer.is_valid():
-                feature_serializer.save()
-            else:
-                # TODO: Rollback?
-                raise Response(
-                    feature_serializer.errors,
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        self.save_geometries(contribution, polygons)
 
     def update(self, request, *args, **kwargs):
         data = request.data.copy()
@@ -463,17 +647,9 @@ class ContributionViewSet(viewsets.ModelViewSet):
         original_crop_element = original_contribution.crop_element
 
         try:
+            # Renaming a crop or crop element refreshes the layer of its geometries through the
+            # post_save signals in api/signals.py.
             with transaction.atomic():
-                layers = [original_crop.get_code()]
-                if original_crop_element:
-                    print("herrerere")
-                    layers.append(original_crop_element.get_code())
-                print(layers)
-                # Fix inconsistencies in the geometries
-                other_geometries = CurrentGeometryFeature.objects.filter(
-                    layer__in=layers
-                )
-
                 if isinstance(crop, str):
                     crop_data = {"name": crop}
 
@@ -642,11 +818,6 @@ class ContributionViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                for geometry in other_geometries:
-                    geometry.layer = geometry.update_layer()
-
-                CurrentGeometryFeature.objects.bulk_update(other_geometries, ["layer"])
-
                 data["crop"] = crop.id
                 data["crop_element"] = crop_element.id if crop_element else None
 
@@ -660,47 +831,73 @@ class ContributionViewSet(viewsets.ModelViewSet):
 
                 return super().update(request, *args, **kwargs)
 
-        except Exception as e:
+        except ValidationError:
+            raise
+        except Exception:
+            logger.exception(
+                "Failed to update contribution",
+                extra={"contribution": kwargs.get("pk")},
+            )
             return Response(
                 {"detail": "Something went wrong."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
     def perform_update(self, serializer):
+        geom = self.request.data.get("geom")
+        polygons = build_polygons(geom)
         contribution = serializer.save()
+        logger.debug(
+            "Updating contribution geometries",
+            extra={"contribution": contribution.id, "polygons": len(polygons)},
+        )
 
-        CurrentGeometryFeature.objects.filter(reference=contribution.id).delete()
+        self.save_geometries(contribution, polygons)
 
-        crop = contribution.crop
-        crop_element = contribution.crop_element
-        suitability_level = contribution.suitability_level
-        geom = self.request.data.get("geom")
+    # Polygons that are already stored are kept; only the difference is written.
+    def save_geometries(self, contribution, polygons):
+        gridcode = contribution.suitability_level.gridcode
+        layer = contribution.get_layer()
+        # The same as `status` sets, so a contribution's features are all shown or all hidden.
+        published = contribution.status == Contribution.Status.APPROVED
 
-        properties = {
-            "gridcode": suitability_level.gridcode,
-            "layer": crop_element.get_code() if crop_element else crop.get_code(),
-            "reference": contribution.id,
+        existing = {
+            bytes(feature.geom.wkb): feature.id
+            for feature in contribution.geometries.only("id", "geom")
         }
-        print(geom)
-        for polygon in geom:
-            geojson_polygon = {
-                "type": "Polygon",
-                "coordinates": [polygon],  # must be nested in a list
-            }
+        kept = []
+        created = []
 
-            # Convert to JSON string before passing to GEOSGeometry
-            geometry = GEOSGeometry(json.dumps(geojson_polygon))
+        for polygon in polygons:
+            feature_id = existing.pop(bytes(polygon.wkb), None)
 
-            feature_data = {"geom": geometry, **properties}
-            feature_serializer = CurrentGeometryFeatureSerializer(data=feature_data)
-            if feature_serializer.is_valid():
-                feature_serializer.save()
+            if feature_id is not None:
+                kept.append(feature_id)
             else:
-                # TODO: Rollback?
-                raise Response(
-                    feature_serializer.errors,
-                    status=status.HTTP_400_BAD_REQUEST,
+                feature = CurrentGeometryFeature(
+                    gridcode=gridcode,
+                    layer=layer,
+                    reference=contribution,
+                    geom=polygon,
+                    published=published,
                 )
+                # bulk_create skips save(), which normally fills these.
+                feature.set_simplified_geometries()
+                created.append(feature)
+
+        # Saving the contribution below invalidates the cached features.
+        if existing:
+            CurrentGeometryFeature.objects.filter(id__in=existing.values()).delete()
+
+        if kept:
+            CurrentGeometryFeature.objects.filter(id__in=kept).exclude(
+                gridcode=gridcode, layer=layer, published=published
+            ).update(gridcode=gridcode, layer=layer, published=published)
+
+        CurrentGeometryFeature.objects.bulk_create(created)
+
+        contribution.set_extent(polygons)
+        contribution.save(update_fields=["centroid", "bbox"])
 
     def destroy(self, request, *args, **kwargs):
         contribution = self.get_object()
@@ -867,7 +1064,8 @@ class FileViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         self.permission_classes = [permissions.IsAuthenticated]
 
-        if self.action in ["list", "retrieve"]:
+        # `download` checks access to the contribution itself.
+        if self.action in ["list", "retrieve", "download"]:
             self.permission_classes = [permissions.AllowAny]
 
         return super().get_permissions()
@@ -888,50 +1086,230 @@ class FileViewSet(viewsets.ModelViewSet):
         contribution = get_object_or_404(Contribution, id=contribution)
         user = get_object_or_404(User, id=user)
 
-        files = []
-        identifiers = []
-
+        # The form describes every file the contribution keeps. Only the new ones come
+        # with their content in `file_{index}`.
+        uploads = []
         index = 0
-        while True:
-            # Check if this index exists.
-            file_identifier = request.POST.get(f"identifier_{index}")
-            file_name = request.POST.get(f"name_{index}")
-            file_size = request.POST.get(f"size_{index}")
-            file_type = request.POST.get(f"type_{index}")
-            file = request.FILES.get(f"file_{index}")
-
-            if not file_identifier:
-                break  # No more files
-
-            # Check if the file already exists in the database.
-            file_instance = File.objects.filter(
-                contribution=contribution, file_identifier=file_identifier
-            ).first()
-            if not file_instance:
-                # Build the data if the file does not exist.
-                data = {
-                    "contribution": contribution.id,
-                    "uploaded_by": user.id,
-                    "file": file,
-                    "file_identifier": file_identifier,
-                    "file_name": file_name,
-                    "file_size": int(file_size),
-                    "file_type": file_type,
-                }
-
-                # Set request._full_data for DRF's `create`
-                request._full_data = data
-                file_reference = super().create(request, *args, **kwargs)
-                files.append(file_reference.data)
+        while request.POST.get(f"identifier_{index}"):
+            upload = {
+                "identifier": request.POST.get(f"identifier_{index}"),
+                "name": request.POST.get(f"name_{index}"),
+                "size": request.POST.get(f"size_{index}"),
+                "type": request.POST.get(f"type_{index}"),
+            }
+            if f"file_{index}" in request.FILES:
+                upload["file"] = request.FILES[f"file_{index}"]
 
-            identifiers.append(file_identifier)
+            uploads.append(upload)
             index += 1  # Move to next file/identifier
 
-        # Check if there are any files to delete.
-        if identifiers:
+        # Nothing listed leaves the files as they are.
+        if not uploads:
+            return Response([], status=status.HTTP_201_CREATED)
+
+        serializer = FileFormListSerializer(data={"files": uploads})
+        serializer.is_valid(raise_exception=True)
+
+        return self.reconcile_files(
+            contribution, user, serializer.validated_data["files"], self.store_file
+        )
+
+    # Approved contributions are public, the rest are only for the people working on them.
+    def can_download(self, user, contribution):
+        if contribution.status == Contribution.Status.APPROVED:
+            return True
+        if not user.is_authenticated:
+            return False
+        if user.is_staff or user.role == User.Role.ADMINISTRATOR:
+            return True
+
+        return (
+            contribution.author_id == user.id
+            or contribution.contributors.filter(id=user.id).exists()
+        )
+
+    @extend_schema(
+        responses={
+            (200, PDFRenderer.media_type): OpenApiTypes.BINARY,
+            (206, PDFRenderer.media_type): OpenApiTypes.BINARY,
+        },
+    )
+    @action(detail=True, renderer_classes=[PDFRenderer, JSONRenderer])
+    def download(self, request, pk=None):
+        file = get_object_or_404(
+            File.objects.select_related("blob", "contribution"), pk=pk
+        )
+        if not self.can_download(request.user, file.contribution):
+            self.permission_denied(request)
+
+        return download_response(
+            request,
+            file,
+            public=file.contribution.status == Contribution.Status.APPROVED,
+        )
+
+    def store_file(self, contribution, upload):
+        if "file" not in upload:
+            raise ValidationError(f"{upload['name']} has not been uploaded.")
+
+        # Stored by content, so a PDF attached to several contributions is stored once.
+        return Blob.store(upload["file"])
+
+    # Registers the listed files that are new and deletes those that aren't listed. Apart
+    # from storing new content, this is the same few queries however many files there are.
+    def reconcile_files(self, contribution, user, uploads, store):
+        registered = self.get_registered_identifiers(contribution, uploads)
+        identifiers = [upload["identifier"] for upload in uploads]
+
+        with transaction.atomic():
+            files = []
+            for upload in uploads:
+                if upload["identifier"] in registered:
+                    continue
+
+                blob = store(contribution, upload)
+                files.append(
+                    File(
+                        contribution=contribution,
+                        uploaded_by=user,
+                        blob=blob,
+                        file=blob.file.name,
+                        file_identifier=upload["identifier"],
+                        file_name=upload["name"],
+                        file_size=blob.size,
+                        file_type=upload["type"],
+                    )
+                )
+
+            File.objects.bulk_create(files)
             # Delete files that are not in the identifiers list.
-            File.objects.filter(contribution=contribution).exclude(
-                file_identifier__in=identifiers
-            ).delete()
+            delete_files(
+                File.objects.filter(contribution=contribution).exclude(
+                    file_identifier__in=identifiers
+                )
+            )
 
-        return Response(files, status=status.HTTP_201_CREATED)
+        return Response(
+            FileSerializer(files, many=True).data, status=status.HTTP_201_CREATED
+        )
+
+    def get_registered_identifiers(self, contribution, uploads):
+        identifiers = [upload["identifier"] for upload in uploads]
+        registered = dict(
+            File.objects.filter(file_identifier__in=identifiers).values_list(
+                "file_identifier", "contribution"
+            )
+        )
+        if any(other != contribution.id for other in registered.values()):
+            raise ValidationError("A file identifier belongs to another contribution.")
+
+        return registered.keys()
+
+    # Uploading in two steps keeps the PDFs off the app's workers: `presign` hands out a form
+    # per new file that the client posts to storage itself, and `confirm` registers them.
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="contribution",
+                description="The contribution the files belong to",
+                required=True,
+                type=int,
+            ),
+        ],
+        request=FileUploadListSerializer,
+    )
+    @action(detail=False, methods=["post"])
+    def presign(self, request):
+        contribution = get_object_or_404(
+            Contribution, id=request.query_params.get("contribution")
+        )
+
+        # Local storage has no upload forms, `create` still accepts the files there.
+        if not hasattr(default_storage, "presigned_post"):
+            return Response(
+                {"error": "Direct uploads need S3 storage."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = FileUploadListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        uploads = serializer.validated_data["files"]
+        registered = self.get_registered_identifiers(contribution, uploads)
+        uploads = [
+            upload for upload in uploads if upload["identifier"] not in registered
+        ]
+
+        missing = [upload["name"] for upload in uploads if "sha256" not in upload]
+        if missing:
+            raise ValidationError(
+                {"sha256": f"Required to upload {', '.join(missing)}."}
+            )
+
+        # Even content that is already stored is uploaded again: only the checksum storage
+        # verifies shows that the client has it. `confirm` then keeps one copy.
+        forms = []
+        for upload in uploads:
+            name = File.get_storage_name(contribution, upload["name"])
+            form = default_storage.presigned_post(
+                name, FILE_TYPE, MAX_FILE_SIZE, upload["sha256"]
+            )
+            forms.append({"identifier": upload["identifier"], **form})
+
+        return Response(forms)
+
+    def store_upload(self, contribution, upload):
+        # The form limited what could be uploaded, but not whether it was.
+        name = File.get_storage_name(contribution, upload["name"])
+        if not default_storage.exists(name):
+            raise ValidationError(f"{upload['name']} has not been uploaded.")
+        size = default_storage.size(name)
+        if size > MAX_FILE_SIZE:
+            raise ValidationError("The file size exceeds 5MB.")
+
+        # The blob is shared, so its hash comes from the storage or is computed here, never
+        # from the client.
+        if hasattr(default_storage, "get_sha256"):
+            sha256 = default_storage.get_sha256(name)
+            if sha256 is None:
+                raise ValidationError(
+                    f"{upload['name']} was uploaded without a checksum."
+                )
+            blob = Blob.store_copy(name, sha256, size)
+        else:
+            with default_storage.open(name) as file:
+                blob = Blob.store(file)
+        transaction.on_commit(lambda: default_storage.delete(name))
+
+        return blob
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="contribution",
+                description="The contribution the files belong to",
+                required=True,
+                type=int,
+            ),
+            OpenApiParameter(
+                name="user",
+                description="The user who uploaded the files",
+                required=True,
+                type=int,
+            ),
+        ],
+        request=FileUploadListSerializer,
+        responses=FileSerializer(many=True),
+    )
+    @action(detail=False, methods=["post"])
+    def confirm(self, request):
+        contribution = get_object_or_404(
+            Contribution, id=request.query_params.get("contribution")
+        )
+        user = get_object_or_404(User, id=request.query_params.get("user"))
+
+        serializer = FileUploadListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return self.reconcile_files(
+            contribution, user, serializer.validated_data["files"], self.store_upload
+        )
@@ -0,0 +1,92 @@
+import math
+import os
+from os import getenv
+
+
+# Gunicorn loads this file from the working directory. Every setting can be overridden from
+# the environment; the defaults are derived from the CPU and memory the container is given.
+# https://docs.gunicorn.org/en/stable/settings.html
+
+
+def available_cpus():
+    # A CPU quota (docker --cpus) is stricter than the cores the process may be scheduled on.
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+
+    return len(os.sched_getaffinity(0))
+
+
+def available_memory():
+    for limit in [
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ]:
+        try:
+            with open(limit) as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            # "max" means no limit.
+            pass
+
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+cpus = available_cpus()
+# What one worker is expected to use, including its share of the preloaded app.
+worker_memory = int(getenv("GUNICORN_WORKER_MEMORY_MB", "256")) * 1024 * 1024
+# Left over for the master process and the rest of the container.
+reserved_memory = int(getenv("GUNICORN_RESERVED_MEMORY_MB", "128")) * 1024 * 1024
+
+memory_workers = (available_memory() - reserved_memory) // worker_memory
+workers = int(getenv("GUNICORN_WORKERS", max(1, min(2 * cpus + 1, memory_workers))))
+
+# SERVER_MODE is also read by the settings to route the async views.
+if getenv("SERVER_MODE", "wsgi") == "asgi":
+    wsgi_app = "sakahan_backend.asgi:application"
+    worker_class = "uvicorn_worker.UvicornWorker"
+else:
+    wsgi_app = "sakahan_backend.wsgi:application"
+    # gthread lets a worker keep serving while a thread waits on the database or S3.
+    worker_class = getenv("GUNICORN_WORKER_CLASS", "gthread")
+    threads = int(getenv("GUNICORN_THREADS", "4"))
+
+# Loading the app once in the master lets the workers share it copy-on-write.
+preload_app = getenv("GUNICORN_PRELOAD", "True") == "True"
+
+# Recycling workers bounds memory growth; the jitter keeps them from restarting together.
+max_requests = int(getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+timeout = int(getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Heartbeat files on tmpfs, so a slow disk can't get workers killed.
+worker_tmp_dir = "/dev/shm"
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+
+    # GEOS and GDAL are loaded on first use; loading them before the fork shares them too.
+    from django.contrib.gis.gdal import gdal_version
+    from django.contrib.gis.geos import geos_version
+
+    gdal_version()
+    geos_version()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+
+    # A connection opened while preloading must not be shared between processes.
+    from django.db import connections
+
+    connections.close_all()
@@ -15,6 +15,7 @@ import dj_database_url
 from dotenv import load_dotenv
 from os import getenv, path
 from pathlib import Path
+from tempfile import gettempdir
 from django.core.management.utils import get_random_secret_key
 
 load_dotenv(override=True)
@@ -44,6 +45,10 @@ DEBUG = getenv("DEBUG", "False") == "True"
 
 ALLOWED_HOSTS = getenv("DJANGO_ALLOWED_HOSTS", "").split(",")
 
+# "wsgi" or "asgi". Under ASGI the busiest read endpoints are served by async views.
+SERVER_MODE = getenv("SERVER_MODE", "wsgi")
+ASYNC_VIEWS = SERVER_MODE == "asgi"
+
 
 # Application definition
 
@@ -66,6 +71,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -99,6 +105,26 @@ WSGI_APPLICATION = "sakahan_backend.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# Connections are kept open for DATABASE_CONN_MAX_AGE seconds and checked before reuse.
+# DATABASE_POOL=True uses a psycopg 3 connection pool instead, which Django only allows
+# with a max age of 0. Persistent connections are not safe under ASGI, so use the pool there.
+# The pool needs the packages in requirements-pool.txt.
+DATABASE_POOL = getenv("DATABASE_POOL", "False") == "True"
+DATABASE_CONN_MAX_AGE = (
+    0
+    if DATABASE_POOL or SERVER_MODE == "asgi"
+    else int(getenv("DATABASE_CONN_MAX_AGE", "60"))
+)
+DATABASE_CONN_HEALTH_CHECKS = getenv("DATABASE_CONN_HEALTH_CHECKS", "True") == "True"
+DATABASE_OPTIONS = {}
+
+if DATABASE_POOL is True:
+    DATABASE_OPTIONS["pool"] = {
+        "min_size": int(getenv("DATABASE_POOL_MIN_SIZE", "2")),
+        "max_size": int(getenv("DATABASE_POOL_MAX_SIZE", "10")),
+        "timeout": int(getenv("DATABASE_POOL_TIMEOUT", "10")),
+    }
+
 if DEVELOPMENT_MODE is True:
     DATABASES = {
         "default": {
@@ -108,16 +134,57 @@ if DEVELOPMENT_MODE is True:
             "PASSWORD": getenv("PASSWORD"),
             "HOST": getenv("HOST"),
             "PORT": getenv("PORT"),
+            "CONN_MAX_AGE": DATABASE_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DATABASE_CONN_HEALTH_CHECKS,
+            "OPTIONS": DATABASE_OPTIONS,
         }
     }
-elif len(sys.argv) > 0 and sys.argv[1] != "collectstatic":
+elif sys.argv[1:2] != ["collectstatic"]:
     if getenv("DATABASE_URL", None) is None:
         raise Exception("DATABASE_URL environment variable not defined")
     DATABASES = {
         "default": dj_database_url.parse(
-            getenv("DATABASE_URL"), "django.contrib.gis.db.backends.postgis"
+            getenv("DATABASE_URL"),
+            "django.contrib.gis.db.backends.postgis",
+            conn_max_age=DATABASE_CONN_MAX_AGE,
+            conn_health_checks=DATABASE_CONN_HEALTH_CHECKS,
         ),
     }
+    # Keep options passed in the URL, such as sslmode.
+    DATABASES["default"]["OPTIONS"] = {
+        **DATABASES["default"].get("OPTIONS", {}),
+        **DATABASE_OPTIONS,
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# "default" is shared by every worker, "local" is a small per-process LRU in front of it.
+# The database backend needs `python manage.py createcachetable` once.
+if getenv("CACHE_BACKEND", "file") == "database":
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "api_cache",
+    }
+else:
+    SHARED_CACHE = {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": getenv("CACHE_LOCATION", path.join(gettempdir(), "sakahan_cache")),
+    }
+
+CACHES = {
+    "default": {
+        **SHARED_CACHE,
+        "TIMEOUT": int(getenv("CACHE_TIMEOUT", "86400")),
+        "OPTIONS": {"MAX_ENTRIES": int(getenv("CACHE_MAX_ENTRIES", "5000"))},
+    },
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+        "TIMEOUT": int(getenv("LOCAL_CACHE_TIMEOUT", "300")),
+        "OPTIONS": {"MAX_ENTRIES": int(getenv("LOCAL_CACHE_MAX_ENTRIES", "500"))},
+    },
+}
 
 
 # Password validation
@@ -174,6 +241,12 @@ else:
         "staticfiles": {"BACKEND": "storages.backends.s3boto3.S3StaticStorage"},
     }
 
+# Lets the web server in front send local files downloaded from /api/files/{id}/download/:
+# "nginx" for X-Accel-Redirect, "sendfile" for X-Sendfile. They are streamed otherwise.
+FILE_DOWNLOAD_OFFLOAD = getenv("FILE_DOWNLOAD_OFFLOAD", "")
+# The internal nginx location that serves MEDIA_ROOT.
+FILE_DOWNLOAD_ACCEL_PREFIX = getenv("FILE_DOWNLOAD_ACCEL_PREFIX", "/protected-media/")
+
 
 # Rest Framework
 REST_FRAMEWORK = {
@@ -196,6 +269,8 @@ SPECTACULAR_SETTINGS = {
     "SERVE_INCLUDE_SCHEMA": False,
     # OTHER SETTINGS
 }
+# Written by `manage.py build_schema` and served as is, instead of generating it per request.
+SCHEMA_FILE = BASE_DIR / "schema.yml"
 
 # Authentication
 DJOSER = {
@@ -256,6 +331,54 @@ DOMAIN = getenv("DOMAIN")
 SITE_NAME = "SAKAHAN"
 
 
+# Contributed Geometries
+# Coordinates are snapped to this many decimal places (7 is roughly 1 cm).
+GEOMETRY_COORDINATE_PRECISION = int(getenv("GEOMETRY_COORDINATE_PRECISION", "7"))
+GEOMETRY_MAX_VERTICES = int(getenv("GEOMETRY_MAX_VERTICES", "5000"))
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+# Records are written to stdout as JSON lines by a background thread. Debug records are
+# sampled, so turning a logger down to DEBUG in production doesn't flood the logs.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "api.logs.JSONFormatter"},
+    },
+    "filters": {
+        "sampled": {
+            "()": "api.logs.SampledFilter",
+            "rate": float(getenv("LOG_DEBUG_SAMPLE_RATE", "0.01")),
+        },
+    },
+    "handlers": {
+        "queue": {
+            "class": "api.logs.QueueingHandler",
+            "formatter": "json",
+            "filters": ["sampled"],
+        },
+    },
+    "root": {
+        "handlers": ["queue"],
+        "level": getenv("LOG_LEVEL", "WARNING"),
+    },
+    "loggers": {
+        "django": {
+            "handlers": ["queue"],
+            "level": getenv("DJANGO_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "api": {
+            "handlers": ["queue"],
+            "level": getenv("API_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -19,27 +19,28 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
 from api.index import IndexAPIView
+from api.lazy import LazyView
 
 
 urlpatterns = [
     path("", IndexAPIView.as_view(), name="index"),
     path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    # The schema views are loaded on first use, they aren't needed to serve the API.
+    path(
+        "api/schema/",
+        LazyView("api.schema.SchemaView"),
+        name="schema",
+    ),
     # Optional UI:
     path(
         "api/schema/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
+        LazyView("drf_spectacular.views.SpectacularSwaggerView", url_name="schema"),
         name="docs",
     ),
     path(
         "api/schema/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
+        LazyView("drf_spectacular.views.SpectacularRedocView", url_name="schema"),
         name="redoc",
     ),
     path("api/", include("djoser.urls")),
@@ -5,7 +5,7 @@ const recordApiSlice = apiSlice.injectEndpoints({
     getAllContribution: builder.query({
       query: ({ filter, tab, page, user }) => ({
         url: "/contributions/",
-        params: { filter, tab, page, user },
+        params: { filter, tab, page, user, expand: "geometries" },
       }),
       providesTags: ["Contributions"],
     }),